@@ -1,84 +1,334 @@
-from datetime import datetime, timezone
-from typing import Any, List
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
-from app.db.session import get_session, AsyncSessionMaker
-from app.schemas.news import NewsCreate, NewsRead, NewsUpdate
-from app.services.events import broadcast_change
-from app.services.news_service import get_news_or_404
-from app.tasks.fetcher import run_background_fetch
+from app.db.session import ReadSessionMaker, get_read_session
+from app.db.writer import db_writer
+from app.schemas.news import (
+    BulkItemResult,
+    BulkResult,
+    NewsBulkDelete,
+    NewsBulkUpdate,
+    NewsChanges,
+    NewsCreate,
+    NewsRead,
+    NewsSearchHit,
+    NewsStats,
+    NewsUpdate,
+)
+from app.services.cache import CachedResponse, read_cache
+from app.services.events import broadcast_change, broadcast_changes
+from app.services.export import EXPORT_FORMATS, export_news
+from app.services.news_service import (
+    bulk_create_news,
+    bulk_delete_news,
+    bulk_update_news,
+    get_changes_since,
+    get_news_stats,
+    get_news_or_404,
+)
+from app.services.pagination import apply_keyset, decode_cursor, page_rows
+from app.services.search import search_news
+from app.nats.lease import leader_lease
+from app.tasks.articles import article_enricher
+from app.tasks.engines import fetch_engine
+from app.tasks.scheduler import fetch_scheduler, run_fetch_on_leader
 from app.models.news import NewsItem
 from sqlalchemy import select
-from app.config import EXTERNAL_CSS_URL, EXTERNAL_HTML_URL
+from app.config import BULK_MAX_ITEMS, EXTERNAL_CSS_URL, EXTERNAL_HTML_URL
 
 router = APIRouter()
 
+_news_list_adapter = TypeAdapter(List[NewsRead])
+
+# How long a follower waits for the leader to finish a forwarded /tasks/run
+FORWARDED_RUN_TIMEOUT = 120.0
+
 templates = Jinja2Templates(directory="templates")
 
 
+def _cached_response(request: Request, entry: CachedResponse) -> Response:
+    headers = {"ETag": entry.etag, **entry.headers}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or entry.etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        read_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
 @router.get("/items", response_model=List[NewsRead])
 async def list_items(
-    limit: int = 50, offset: int = 0, session: AsyncSession = Depends(get_session)
-) -> List[NewsRead]:
-    stmt = select(NewsItem).offset(offset).limit(limit).order_by(NewsItem.id.desc())
-    result = await session.execute(stmt)
-    return result.scalars().all()
+    request: Request,
+    limit: int = Query(50, ge=1),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    order: str = Query("id", pattern="^(id|updated_at|comments)$"),
+    country: Optional[str] = None,
+    min_comments: Optional[int] = Query(None, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+) -> Response:
+    """List news by ``order`` descending, optionally filtered.
+
+    Pass the opaque ``X-Next-Cursor`` / ``X-Prev-Cursor`` response headers back
+    as ``cursor`` (with the same filters) to page by keyset; ``offset`` is kept
+    for older clients.
+    """
+    key = ("list", limit, offset, cursor, order, country, min_comments)
+    entry = read_cache.get(key) if read_cache.enabled else None
+    if entry is None:
+        generation = read_cache.generation
+        direction = values = None
+        if cursor:
+            order, direction, values = decode_cursor(cursor)
+        stmt = select(NewsItem)
+        if country is not None:
+            stmt = stmt.where(NewsItem.country == country)
+        if min_comments is not None:
+            stmt = stmt.where(NewsItem.comments >= min_comments)
+        stmt = apply_keyset(stmt, order, direction, values)
+        if values is None and offset:
+            stmt = stmt.offset(offset)
+        result = await session.execute(stmt.limit(limit + 1))
+        items, next_cursor, prev_cursor = page_rows(
+            result.scalars().all(), limit, order, direction, has_previous=bool(cursor or offset)
+        )
+        headers = {}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        if prev_cursor:
+            headers["X-Prev-Cursor"] = prev_cursor
+        body = _news_list_adapter.dump_json([NewsRead.model_validate(item) for item in items])
+        filtered = country is not None or min_comments is not None
+        entry = CachedResponse(
+            body, headers, {item.id for item in items}, f"{order}:filtered" if filtered else order
+        )
+        read_cache.put(key, entry, generation)
+    return _cached_response(request, entry)
+
+
+@router.get("/items/changes", response_model=NewsChanges)
+async def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_read_session),
+) -> dict[str, Any]:
+    """Rows created or changed and ids deleted after ``since``.
+
+    Clients keep the returned ``version`` and pass it as ``since`` on the next
+    call; keep calling while ``has_more`` is true.
+    """
+    return await get_changes_since(session, since, limit)
+
+
+@router.get("/items/stats", response_model=NewsStats)
+async def items_stats(
+    request: Request,
+    top: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+) -> Response:
+    """Item counts per country and the most commented items."""
+    key = ("stats", top)
+    entry = read_cache.get(key) if read_cache.enabled else None
+    if entry is None:
+        generation = read_cache.generation
+        stats = NewsStats.model_validate(await get_news_stats(session, top))
+        entry = CachedResponse(stats.model_dump_json().encode(), {}, set(), "stats")
+        read_cache.put(key, entry, generation)
+    return _cached_response(request, entry)
+
+
+@router.get("/items/search", response_model=List[NewsSearchHit])
+async def search_items(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_read_session),
+) -> List[NewsSearchHit]:
+    """Full-text search over titles, best match first.
+
+    ``snippet`` is the matching fragment, HTML-escaped, with hits wrapped in ``<mark>``.
+    """
+    return [
+        NewsSearchHit(**NewsRead.model_validate(item).model_dump(), snippet=snippet, rank=rank)
+        for item, snippet, rank in await search_news(session, q, limit, offset)
+    ]
+
+
+@router.get("/items/export")
+async def export_items(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[int] = Query(None, ge=0),
+    country: Optional[str] = None,
+) -> StreamingResponse:
+    """Stream every item (or those changed after ``since``) as NDJSON or CSV.
+
+    The body is gzip-encoded when the client sends ``Accept-Encoding: gzip``.
+    """
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="news.{format}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(
+        export_news(format, since, country, compress),
+        media_type=EXPORT_FORMATS[format],
+        headers=headers,
+    )
+
+
+def _check_bulk_size(count: int) -> None:
+    if count > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per bulk request"
+        )
+
+
+async def _bulk_response(results: List[dict[str, Any]], event: str) -> BulkResult:
+    # "item.created" -> results with status "created" succeeded
+    done = event.split(".", 1)[1]
+    response = BulkResult(
+        results=[BulkItemResult.model_validate(result) for result in results],
+        succeeded=sum(result["status"] == done for result in results),
+        failed=sum(result["status"] != done for result in results),
+    )
+    changes = {
+        result.id: result.item.model_dump() if result.item else {"id": result.id}
+        for result in response.results
+        if result.status == done
+    }
+    # Replicas match items by url: deletes carry theirs, url changes the old one.
+    for result in results:
+        if result["status"] == done:
+            changes[result["id"]].update(
+                {name: result[name] for name in ("url", "previous_url") if name in result}
+            )
+    # Deletes carry no country; theirs route WebSocket subscriptions.
+    countries = {result["id"]: result["country"] for result in results if "country" in result}
+    await broadcast_changes([(event, payload) for payload in changes.values()], countries)
+    return response
+
+
+@router.post("/items/bulk", response_model=BulkResult)
+async def bulk_create_items(payload: List[NewsCreate]) -> BulkResult:
+    """Create many items in one transaction; duplicate URLs are reported per item."""
+    _check_bulk_size(len(payload))
+    entries = [entry.dict() for entry in payload]
+    results = await db_writer.run(lambda session: bulk_create_news(session, entries))
+    return await _bulk_response(results, "item.created")
+
+
+@router.patch("/items/bulk", response_model=BulkResult)
+async def bulk_update_items(payload: List[NewsBulkUpdate]) -> BulkResult:
+    _check_bulk_size(len(payload))
+    entries = [entry.dict(exclude_unset=True) for entry in payload]
+    results = await db_writer.run(lambda session: bulk_update_news(session, entries))
+    return await _bulk_response(results, "item.updated")
+
+
+@router.delete("/items/bulk", response_model=BulkResult)
+async def bulk_delete_items(payload: NewsBulkDelete) -> BulkResult:
+    _check_bulk_size(len(payload.ids))
+    results = await db_writer.run(lambda session: bulk_delete_news(session, payload.ids))
+    return await _bulk_response(results, "item.deleted")
 
 
 @router.get("/items/{item_id}", response_model=NewsRead)
-async def get_item(item_id: int, session: AsyncSession = Depends(get_session)) -> NewsRead:
-    item = await get_news_or_404(session, item_id)
-    return item
+async def get_item(
+    request: Request, item_id: int, session: AsyncSession = Depends(get_read_session)
+) -> Response:
+    key = ("item", item_id)
+    entry = read_cache.get(key) if read_cache.enabled else None
+    if entry is None:
+        generation = read_cache.generation
+        item = await get_news_or_404(session, item_id)
+        body = NewsRead.model_validate(item).model_dump_json().encode()
+        entry = CachedResponse(body, {}, {item_id}, None)
+        read_cache.put(key, entry, generation)
+    return _cached_response(request, entry)
 
 
 @router.post("/items", response_model=NewsRead, status_code=201)
-async def create_item(
-    payload: NewsCreate, session: AsyncSession = Depends(get_session)
-) -> NewsRead:
-    item = NewsItem(**payload.dict())
-    session.add(item)
+async def create_item(payload: NewsCreate) -> Response:
+    async def write(session: AsyncSession) -> NewsItem:
+        item = NewsItem(**payload.dict())
+        session.add(item)
+        await session.flush()
+        await session.refresh(item)
+        return item
+
     try:
-        await session.commit()
+        item = await db_writer.run(write)
     except IntegrityError:
-        await session.rollback()
-        from fastapi import HTTPException
-
         raise HTTPException(status_code=409, detail="Item with this URL already exists")
-    await session.refresh(item)
-    await broadcast_change("item.created", NewsRead.from_orm(item).dict())
-    return item
+    read = NewsRead.model_validate(item)
+    await broadcast_change("item.created", read.model_dump())
+    return Response(read.model_dump_json(), status_code=201, media_type="application/json")
 
 
 @router.patch("/items/{item_id}", response_model=NewsRead)
-async def update_item(
-    item_id: int, payload: NewsUpdate, session: AsyncSession = Depends(get_session)
-) -> NewsRead:
-    item = await get_news_or_404(session, item_id)
-    for field, value in payload.dict(exclude_unset=True).items():
-        setattr(item, field, value)
-    await session.commit()
-    await session.refresh(item)
-    await broadcast_change("item.updated", NewsRead.from_orm(item).dict())
-    return item
+async def update_item(item_id: int, payload: NewsUpdate) -> Response:
+    async def write(session: AsyncSession) -> Tuple[NewsItem, str]:
+        item = await get_news_or_404(session, item_id)
+        previous_url = item.url
+        for field, value in payload.dict(exclude_unset=True).items():
+            setattr(item, field, value)
+        await session.flush()
+        await session.refresh(item)
+        return item, previous_url
+
+    item, previous_url = await db_writer.run(write)
+    read = NewsRead.model_validate(item)
+    change = read.model_dump()
+    if previous_url != item.url:
+        # Replicas match items by url, so they need the one being replaced.
+        change["previous_url"] = previous_url
+    await broadcast_change("item.updated", change)
+    return Response(read.model_dump_json(), media_type="application/json")
 
 
 @router.delete("/items/{item_id}", status_code=204)
-async def delete_item(item_id: int, session: AsyncSession = Depends(get_session)) -> None:
-    item = await get_news_or_404(session, item_id)
-    await session.delete(item)
-    await session.commit()
-    await broadcast_change("item.deleted", {"id": item_id})
+async def delete_item(item_id: int) -> None:
+    async def write(session: AsyncSession) -> Tuple[str, Optional[str]]:
+        item = await get_news_or_404(session, item_id)
+        await session.delete(item)
+        return item.url, item.country
+
+    url, country = await db_writer.run(write)
+    await broadcast_change("item.deleted", {"id": item_id, "url": url}, country=country)
 
 
 @router.post("/tasks/run")
 async def run_task_now() -> dict[str, Any]:
-    payload = await run_background_fetch(AsyncSessionMaker, datetime.now(timezone.utc))
-    return {"status": "scheduled", **payload}
+    """Run a fetch now, or wait for the one already running and return its result.
+
+    With a leader lease the run happens on the leader instance.
+    """
+    try:
+        record, joined = await run_fetch_on_leader(FORWARDED_RUN_TIMEOUT)
+    except Exception as exc:
+        raise HTTPException(status_code=503, detail=f"No fetch leader available: {exc}")
+    if record["status"] != "ok":
+        raise HTTPException(status_code=502, detail=f"Fetch failed: {record['error']}")
+    return {"status": "scheduled", "joined": joined, **record["result"]}
+
+
+@router.get("/tasks/status")
+async def task_status() -> dict[str, Any]:
+    return {
+        **fetch_scheduler.stats(),
+        "lease": leader_lease.stats(),
+        "engines": fetch_engine.stats(),
+        "enrichment": article_enricher.stats(),
+    }
 
 
 @router.get("/news", response_class=HTMLResponse)
@@ -103,7 +353,7 @@ async def news_page(request: Request, css_url: str | None = None, html_url: str
 
     chosen_css = css_url or EXTERNAL_CSS_URL
 
-    async with AsyncSessionMaker() as session:
+    async with ReadSessionMaker() as session:
         stmt = select(NewsItem).order_by(NewsItem.id.desc()).limit(50)
         result = await session.execute(stmt)
         items = result.scalars().all()
@@ -1,8 +1,96 @@
 import os
+import socket
+import uuid
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./news.db")
+# SQLite tuning: connection pool for GET requests, lock wait, page cache and mmap sizes
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "5"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Writes are queued to one writer task; it commits up to this many jobs together
+DB_WRITER_MAX_BATCH = int(os.getenv("DB_WRITER_MAX_BATCH", "64"))
+# Upper bound on items accepted by one /items/bulk request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+# Rows fetched from the streaming cursor and written per chunk by /items/export
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+# /items/search ranks only the newest this-many matches of a query (0 ranks all of them)
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "5000"))
 NATS_URL = os.getenv("NATS_URL", "nats://localhost:4222")
+# Stamped on every published event so an instance can ignore its own echoes
+INSTANCE_ID = os.getenv("INSTANCE_ID") or uuid.uuid4().hex
+# How many recent NATS event ids are remembered for duplicate suppression
+NATS_DEDUP_WINDOW = int(os.getenv("NATS_DEDUP_WINDOW", "10000"))
+# JetStream: acked publishes and a durable pull consumer that replays missed events
+NATS_JETSTREAM = os.getenv("NATS_JETSTREAM", "false").lower() in ("1", "true", "yes")
+NATS_STREAM = os.getenv("NATS_STREAM", "ITEMS")
+# Stream retention; older events (or the oldest beyond the size cap) are discarded, 0 = no limit
+NATS_STREAM_MAX_AGE = float(os.getenv("NATS_STREAM_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+NATS_STREAM_MAX_BYTES = int(os.getenv("NATS_STREAM_MAX_BYTES", str(1 << 30)))
+# Must stay stable across restarts of the same instance to resume from its last ack; the
+# hostname fallback changes whenever a container is recreated, so set it explicitly there
+NATS_DURABLE_SET = bool(os.getenv("NATS_DURABLE"))
+NATS_DURABLE = os.getenv("NATS_DURABLE") or "hltv-" + socket.gethostname().replace(".", "-")
+NATS_FETCH_BATCH = int(os.getenv("NATS_FETCH_BATCH", "100"))
+# Wire codec of published NATS events (json, or msgpack when installed); subscribers
+# decode by the Content-Type header, so instances with different codecs interoperate
+NATS_CODEC = os.getenv("NATS_CODEC", "json")
+# Only the holder of this NATS KV lease runs the scheduled fetcher; an expired lease
+# (holder died) is taken over by another instance within about one TTL
+LEADER_LEASE = os.getenv("LEADER_LEASE", "false").lower() in ("1", "true", "yes")
+LEADER_LEASE_BUCKET = os.getenv("LEADER_LEASE_BUCKET", "hltv_leader")
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL_SECONDS", "6"))
+# Incoming NATS changes are applied in batches of up to this size, or after this delay
+NATS_APPLY_BATCH_SIZE = int(os.getenv("NATS_APPLY_BATCH_SIZE", "200"))
+NATS_APPLY_MAX_DELAY_MS = int(os.getenv("NATS_APPLY_MAX_DELAY_MS", "50"))
 FETCH_INTERVAL = int(os.getenv("FETCH_INTERVAL_SECONDS", "300"))
+# Adaptive schedule: the interval moves between these bounds depending on whether
+# runs find new items; failed runs back off exponentially (with jitter) up to a cap
+FETCH_MIN_INTERVAL = int(os.getenv("FETCH_MIN_INTERVAL_SECONDS", str(max(1, FETCH_INTERVAL // 5))))
+FETCH_MAX_INTERVAL = int(os.getenv("FETCH_MAX_INTERVAL_SECONDS", str(FETCH_INTERVAL * 3)))
+FETCH_RETRY_BASE = int(os.getenv("FETCH_RETRY_BASE_SECONDS", "30"))
+FETCH_MAX_BACKOFF = int(os.getenv("FETCH_MAX_BACKOFF_SECONDS", "1800"))
+# Number of recent fetch runs reported by /tasks/status
+FETCH_HISTORY_SIZE = int(os.getenv("FETCH_HISTORY_SIZE", "20"))
+# Page the fetcher loads (e.g. a mirror or a local fixture server); item urls stay on hltv.org
+FETCH_URL = os.getenv("FETCH_URL", "https://www.hltv.org")
+# Front-page fetch engines tried in order: plain HTTP + HTML parser first, headless
+# Chromium only when it is blocked or finds no rows
+FETCH_ENGINES = [
+    name.strip() for name in os.getenv("FETCH_ENGINES", "http,playwright").split(",") if name.strip()
+]
+FETCH_HTTP_TIMEOUT = float(os.getenv("FETCH_HTTP_TIMEOUT_SECONDS", "15"))
+FETCH_HTTP_MAX_CONNECTIONS = int(os.getenv("FETCH_HTTP_MAX_CONNECTIONS", "4"))
+# Number of reusable Chromium context/page slots kept by the fetcher
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+# Playwright resource types aborted by the fetcher (comma-separated, empty to load everything)
+FETCH_BLOCKED_RESOURCES = frozenset(
+    t.strip()
+    for t in os.getenv("FETCH_BLOCKED_RESOURCES", "image,media,font,stylesheet").split(",")
+    if t.strip()
+)
+# Optional article-page enrichment (body, author, publish time) after each fetch: tabs
+# opened in parallel, requests per second per host and the per-page timeout
+ARTICLE_ENRICHMENT = os.getenv("ARTICLE_ENRICHMENT", "false").lower() in ("1", "true", "yes")
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+ENRICH_HOST_RATE = float(os.getenv("ENRICH_HOST_RATE", "2"))
+ENRICH_PAGE_TIMEOUT = float(os.getenv("ENRICH_PAGE_TIMEOUT_SECONDS", "20"))
+
+# Per-connection WebSocket send queue; overflow policy is drop_oldest, coalesce or disconnect
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "100"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+
+# Coalescing window for change events (0 disables batching) and max events per batch
+EVENT_BATCH_WINDOW_MS = int(os.getenv("EVENT_BATCH_WINDOW_MS", "0"))
+EVENT_BATCH_MAX_SIZE = int(os.getenv("EVENT_BATCH_MAX_SIZE", "100"))
+
+# Prometheus metrics at /metrics (request, DB, fetch, WebSocket and NATS timings)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# In-process cache of serialized /items responses (0 disables)
+READ_CACHE_MAX_BYTES = int(os.getenv("READ_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "1024"))
 
 # Optional URL to external CSS (e.g., Yandex Cloud Storage)
 EXTERNAL_CSS_URL = os.getenv("EXTERNAL_CSS_URL", "https://storage.yandexcloud.net/prodproject/news.css")
@@ -1,29 +1,146 @@
 import logging
-from typing import AsyncIterator
+import time
+from typing import Any, AsyncIterator, List
 
+from sqlalchemy import event, inspect
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import declarative_base
 
-from app.config import DATABASE_URL
+from app.config import (
+    DATABASE_URL,
+    DB_READ_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE,
+)
+from app.services.metrics import DB_QUERY_SECONDS, metrics
 
 logger = logging.getLogger("hltv_app")
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+
+def configure_sqlite(async_engine: AsyncEngine, read_only: bool = False) -> AsyncEngine:
+    """Apply WAL and connection pragmas to every new SQLite connection.
+
+    pysqlite's implicit transaction handling is switched off so SQLAlchemy
+    controls BEGIN itself (needed for SAVEPOINTs); writers take the lock up
+    front with BEGIN IMMEDIATE, read-only connections refuse writes.
+    """
+    if async_engine.dialect.name != "sqlite":
+        return async_engine
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        if not _is_memory(str(async_engine.url)):
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(async_engine.sync_engine, "begin")
+    def _on_begin(conn: Any) -> None:
+        conn.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+    return async_engine
+
+
+_STATEMENT_KINDS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def time_queries(async_engine: AsyncEngine, pool: str) -> AsyncEngine:
+    """Record every statement's execution time in ``hltv_db_query_duration_seconds``."""
+    if not metrics.enabled:
+        return async_engine
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        started = conn.info.pop("query_started", None)
+        if started is None:
+            return
+        kind = statement.lstrip()[:6].upper()
+        DB_QUERY_SECONDS.observe(
+            time.perf_counter() - started, pool, kind if kind in _STATEMENT_KINDS else "OTHER"
+        )
+
+    return async_engine
+
+
+def _is_memory(url: str) -> bool:
+    return ":memory:" in url or "mode=memory" in url or url.rstrip("/").endswith("sqlite+aiosqlite:")
+
+
+engine = time_queries(
+    configure_sqlite(create_async_engine(DATABASE_URL, echo=False, future=True)), "write"
+)
 AsyncSessionMaker = async_sessionmaker(engine, expire_on_commit=False)
+if _is_memory(DATABASE_URL):
+    # A second engine would open a different in-memory database.
+    read_engine = engine
+else:
+    read_engine = time_queries(
+        configure_sqlite(
+            create_async_engine(
+                DATABASE_URL, echo=False, future=True, pool_size=DB_READ_POOL_SIZE
+            ),
+            read_only=True,
+        ),
+        "read",
+    )
+ReadSessionMaker = async_sessionmaker(read_engine, expire_on_commit=False)
 Base = declarative_base()
 
+# Idempotent SQL (triggers, seed rows) that models register to run after the
+# schema is created or migrated on every start.
+POST_CREATE_DDL: List[str] = []
+
 
 async def get_session() -> AsyncIterator[AsyncSession]:
     async with AsyncSessionMaker() as session:
         yield session
 
 
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    async with ReadSessionMaker() as session:
+        yield session
+
+
+def _create_missing_columns_and_indexes(conn) -> None:
+    # create_all skips tables that already exist, so nullable columns and
+    # indexes added later would never reach an existing database without this.
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        present = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in present and column.nullable:
+                col_type = column.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'
+                )
+                logger.info("Added column %s.%s", table.name, column.name)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
 async def init_db() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_columns_and_indexes)
+        for statement in POST_CREATE_DDL:
+            await conn.exec_driver_sql(statement)
         logger.info("DB schema ready")
 
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import DB_WRITER_MAX_BATCH
+from app.db.session import AsyncSessionMaker
+
+logger = logging.getLogger("hltv_app")
+
+T = TypeVar("T")
+WriteJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class DatabaseWriter:
+    """Single task that owns all writes to the database.
+
+    Callers submit ``job(session)`` coroutines with :meth:`run`. Jobs that are
+    queued together are executed one after another in the same transaction,
+    each inside a SAVEPOINT so a failing job only rolls back itself, and are
+    committed once (group commit). Jobs must not commit; ``flush`` is enough
+    to get generated ids. Until :meth:`start` is called (scripts, benchmarks)
+    each job runs in its own session and transaction.
+    """
+
+    def __init__(
+        self, session_factory: async_sessionmaker[AsyncSession], max_batch: int
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self._queue: "asyncio.Queue[Tuple[WriteJob, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.commits = 0
+        self.jobs = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run(self, job: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        if self._task is None:
+            async with self.session_factory() as session:
+                result = await job(session)
+                await session.commit()
+                return result
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future))
+        return await future
+
+    async def _loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._commit_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit_batch(self, batch: List[Tuple[WriteJob, asyncio.Future]]) -> None:
+        outcomes: List[Tuple[asyncio.Future, Any, Optional[BaseException]]] = []
+        try:
+            async with self.session_factory() as session:
+                for job, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            result = await job(session)
+                        outcomes.append((future, result, None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+                await session.commit()
+        except Exception as exc:
+            logger.warning("Group commit of %s write jobs failed: %s", len(batch), exc)
+            outcomes = [(future, None, exc) for _, future in batch]
+        self.commits += 1
+        self.jobs += len(batch)
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "commits": self.commits,
+            "jobs": self.jobs,
+            "queued": self._queue.qsize(),
+            "avg_jobs_per_commit": self.jobs / self.commits if self.commits else None,
+        }
+
+
+db_writer = DatabaseWriter(AsyncSessionMaker, DB_WRITER_MAX_BATCH)
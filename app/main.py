@@ -1,19 +1,26 @@
-import asyncio
-import json
 import logging
 import os
 from logging.handlers import RotatingFileHandler
-from typing import Optional
+from typing import Any, List, Optional
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.api.routes import router as api_router
-from app.config import FETCH_INTERVAL
-from app.db.session import engine, AsyncSessionMaker, init_db
-from app.nats.client import NATS_SUBJECT, NatsMsg, nats_client
-from app.tasks.fetcher import periodic_task
+from app.db.session import engine, init_db, read_engine
+from app.db.writer import db_writer
+from app.nats.client import NATS_SUBJECT, NatsMsg, decode_message, event_filter, nats_client
+from app.nats.lease import leader_lease
+from app.services.cache import read_cache
+from app.services.codec import negotiate
+from app.services.events import BATCH_EVENT, event_batcher
+from app.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.services.metrics import MetricsMiddleware, metrics
+from app.services.replication import replication_applier
+from app.tasks.browser import browser_manager
+from app.tasks.engines import fetch_engine
+from app.tasks.scheduler import fetch_scheduler, start_leader_scheduling
 from app.ws.manager import ws_manager
 
 # Logging: use project-local logs directory by default; override with HLTV_LOG_DIR env var
@@ -46,124 +53,134 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Prev-Cursor"],
 )
+if metrics.enabled:
+    app.add_middleware(MetricsMiddleware)
 # Mount local static files for development (serves /static/news.css)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(api_router)
 
 
 @app.websocket("/ws/items")
-async def websocket_items(websocket: WebSocket) -> None:
-    await ws_manager.connect(websocket)
+async def websocket_items(
+    websocket: WebSocket, batch: bool = False, codec: Optional[str] = None
+) -> None:
+    """Frames are JSON text by default; a client picks another codec with the
+    ``hltv.<codec>`` subprotocol or ``?codec=`` (binary frames for msgpack)."""
+    chosen, subprotocol = negotiate(websocket.scope.get("subprotocols", []), codec)
+    if chosen is None:
+        await websocket.close(code=1003, reason=f"Unsupported codec: {codec}")
+        return
+    await ws_manager.connect(websocket, batched=batch, codec=chosen, subprotocol=subprotocol)
     try:
+        # Client frames are subscription changes:
+        # {"action": "subscribe" | "unsubscribe" | "reset", "events": [...],
+        #  "countries": [...], "ids": [...]}
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            raw = message.get("text") or message.get("bytes")
+            ws_manager.handle_client_message(websocket, raw)
+    finally:
         ws_manager.disconnect(websocket)
 
 
+@app.get("/ws/stats")
+async def websocket_stats() -> dict[str, Any]:
+    return ws_manager.stats()
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> dict[str, Any]:
+    return read_cache.stats()
+
+
+@app.get("/db/stats")
+async def db_stats() -> dict[str, Any]:
+    return db_writer.stats()
+
+
+metrics.gauge(
+    "hltv_ws_connections", "Connected /ws/items clients.", lambda: len(ws_manager.active)
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/nats/stats")
+async def nats_stats() -> dict[str, Any]:
+    return event_filter.stats()
+
+
 async def nats_message_handler(msg: NatsMsg) -> None:
     try:
-        payload = json.loads(msg.data.decode())
-    except Exception:
-        logger.warning("Received non-JSON NATS message")
+        payload = decode_message(msg)
+    except Exception as exc:
+        logger.warning("Received undecodable NATS message: %s", exc)
+        return
+    if not isinstance(payload, dict) or not event_filter.accept(payload):
         return
     logger.info("NATS message received: %s", payload)
 
     await ws_manager.broadcast({"event": "nats.forwarded", "data": payload})
 
-    event = payload.get("event")
-    data = payload.get("data", {})
-    
-    if event == "item.created" and isinstance(data, dict) and data.get("url"):
-        async with AsyncSessionMaker() as session:
-            from app.models.news import NewsItem
-            from sqlalchemy import select
-
-            stmt = select(NewsItem).where(NewsItem.url == data.get("url"))
-            result = await session.execute(stmt)
-            existing = result.scalar_one_or_none()
-            
-            if not existing and data.get("url"):
-                item = NewsItem(
-                    title=data.get("title", "Untitled"),
-                    url=data.get("url"),
-                    country=data.get("country"),
-                    published_text=data.get("published_text"),
-                    comments=data.get("comments"),
-                )
-                session.add(item)
-                await session.commit()
-                logger.info("Created news item from NATS: %s", data.get("url"))
-    
-    elif event == "item.updated" and isinstance(data, dict) and "id" in data:
-        async with AsyncSessionMaker() as session:
-            from app.models.news import NewsItem
-            from sqlalchemy import select, update
-            
-            stmt = select(NewsItem).where(NewsItem.id == data.get("id"))
-            result = await session.execute(stmt)
-            existing = result.scalar_one_or_none()
-            
-            if existing:
-                await session.execute(
-                    update(NewsItem)
-                    .where(NewsItem.id == data.get("id"))
-                    .values(
-                        title=data.get("title", existing.title),
-                        country=data.get("country", existing.country),
-                        published_text=data.get("published_text", existing.published_text),
-                        comments=data.get("comments", existing.comments),
-                    )
-                )
-                await session.commit()
-                logger.info("Updated news item from NATS: id=%s", data.get("id"))
-    
-    elif event == "item.deleted" and isinstance(data, dict) and "id" in data:
-        async with AsyncSessionMaker() as session:
-            from app.models.news import NewsItem
-            from sqlalchemy import select
-            
-            stmt = select(NewsItem).where(NewsItem.id == data.get("id"))
-            result = await session.execute(stmt)
-            existing = result.scalar_one_or_none()
-            
-            if existing:
-                await session.delete(existing)
-                await session.commit()
-                logger.info("Deleted news item from NATS: id=%s", data.get("id"))
-
-
-stop_event = asyncio.Event()
-background_task: Optional[asyncio.Task] = None
+    entries = payload.get("data") if payload.get("event") == BATCH_EVENT else [payload]
+    try:
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict):
+                await replication_applier.submit(entry.get("event"), entry.get("data", {}))
+    except Exception:
+        # Let a redelivery of this message through the duplicate filter.
+        event_filter.forget(payload.get("event_id"))
+        raise
+    event_filter.applied += 1
 
 
+async def nats_batch_applied(msgs: List[NatsMsg]) -> bool:
+    """Flush buffered JetStream events before they are acked."""
+    if await replication_applier.commit():
+        return True
+    # The batch will be redelivered; let its event ids through again.
+    for msg in msgs:
+        event_filter.forget((msg.headers or {}).get("Nats-Msg-Id"))
+    return False
+
 
 @app.on_event("startup")
 async def on_startup() -> None:
     await init_db()
+    await db_writer.start()
     await nats_client.connect()
-    await nats_client.subscribe(NATS_SUBJECT, nats_message_handler)
-
-    global background_task, stop_event
-    stop_event = asyncio.Event()
-    background_task = asyncio.create_task(
-        periodic_task(stop_event, AsyncSessionMaker, FETCH_INTERVAL)
-    )
-    logger.info("Background fetcher started every %s seconds", FETCH_INTERVAL)
+    await nats_client.subscribe(NATS_SUBJECT, nats_message_handler, on_batch=nats_batch_applied)
+    # Chromium is a fallback by default: launch it up front only when it is
+    # the primary engine, otherwise on first use.
+    if fetch_engine.engines and fetch_engine.engines[0].name == "playwright":
+        await browser_manager.start()
+    await leader_lease.start()
+    await start_leader_scheduling()
+    await fetch_scheduler.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    stop_event.set()
-    if background_task:
-        background_task.cancel()
-        try:
-            await background_task
-        except asyncio.CancelledError:
-            pass
+    await fetch_scheduler.stop()
+    await leader_lease.stop()
+    await fetch_engine.close()
+    await browser_manager.stop()
+    await event_batcher.flush()
     await nats_client.close()
+    await replication_applier.flush()
+    await db_writer.stop()
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     logger.info("Application shutdown complete")
 
 
@@ -1,12 +1,44 @@
+import hashlib
+import json
 from datetime import datetime, timezone
+from typing import Any, Mapping
 
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text, event
 
-from app.db.session import Base
+from app.db.session import POST_CREATE_DDL, Base
+
+# Scraped fields that make up an item's content fingerprint.
+CONTENT_FIELDS = ("title", "country", "published_text", "comments")
+# Fields filled from the article page by the enrichment stage.
+ARTICLE_FIELDS = ("body", "author", "published_at")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def compute_content_hash(values: Mapping[str, Any]) -> str:
+    raw = json.dumps([values.get(name) for name in CONTENT_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def compute_article_hash(url: str, title: str) -> str:
+    # Comments and the relative publish text change all the time; the article
+    # itself only counts as changed when its url or headline does.
+    raw = json.dumps([url, title], ensure_ascii=False)
+    return hashlib.sha1(raw.encode()).hexdigest()
 
 
 class NewsItem(Base):
     __tablename__ = "news_items"
+    # Composite indexes for every /items sort key, alone and after a country filter.
+    __table_args__ = (
+        Index("ix_news_items_updated_at_id", "updated_at", "id"),
+        Index("ix_news_items_comments_id", "comments", "id"),
+        Index("ix_news_items_country_id", "country", "id"),
+        Index("ix_news_items_country_updated_at_id", "country", "updated_at", "id"),
+        Index("ix_news_items_country_comments_id", "country", "comments", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
@@ -14,10 +46,153 @@ class NewsItem(Base):
     country = Column(String(120), nullable=True)
     published_text = Column(String(120), nullable=True)
     comments = Column(Integer, nullable=True)
-    created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
-    updated_at = Column(
-        DateTime(timezone=True),
-        default=datetime.now(timezone.utc),
-        onupdate=datetime.now(timezone.utc),
+    content_hash = Column(String(40), nullable=True)
+    body = Column(Text, nullable=True)
+    author = Column(String(120), nullable=True)
+    published_at = Column(DateTime(timezone=True), nullable=True)
+    # compute_article_hash() of the url/title the article details were fetched for
+    article_hash = Column(String(40), nullable=True)
+    enriched_at = Column(DateTime(timezone=True), nullable=True)
+    # Maintained by triggers; see CHANGE_TRACKING_DDL.
+    change_version = Column(Integer, nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), default=_utcnow)
+    updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow)
+
+
+@event.listens_for(NewsItem, "before_insert")
+@event.listens_for(NewsItem, "before_update")
+def _refresh_content_hash(mapper: Any, connection: Any, target: NewsItem) -> None:
+    target.content_hash = compute_content_hash(
+        {name: getattr(target, name) for name in CONTENT_FIELDS}
     )
 
+
+class NewsTombstone(Base):
+    __tablename__ = "news_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, nullable=False)
+    url = Column(String(500), nullable=False)
+    change_version = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ChangeSequence(Base):
+    __tablename__ = "news_change_seq"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+class CountryCount(Base):
+    """Number of items per country, maintained by triggers (NULL country is '')."""
+
+    __tablename__ = "news_country_counts"
+
+    country = Column(String(120), primary_key=True)
+    items = Column(Integer, nullable=False)
+
+
+# Every insert, content update or delete of a news item takes the next value
+# of the single-row news_change_seq counter, whichever code path wrote it;
+# deletes leave a tombstone so delta clients can drop the row.
+_BUMP_VERSION = "UPDATE news_change_seq SET version = version + 1 WHERE id = 1;"
+_CURRENT_VERSION = "(SELECT version FROM news_change_seq WHERE id = 1)"
+CHANGE_TRACKING_DDL = [
+    # First start with change tracking: number existing rows, then seed the counter.
+    "UPDATE news_items SET change_version = id WHERE change_version IS NULL "
+    "AND NOT EXISTS (SELECT 1 FROM news_change_seq)",
+    "INSERT OR IGNORE INTO news_change_seq (id, version) "
+    "SELECT 1, COALESCE(MAX(change_version), 0) FROM news_items",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_version_ai AFTER INSERT ON news_items
+    BEGIN
+        {_BUMP_VERSION}
+        UPDATE news_items SET change_version = {_CURRENT_VERSION} WHERE id = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_version_au
+    AFTER UPDATE OF title, url, country, published_text, comments ON news_items
+    BEGIN
+        {_BUMP_VERSION}
+        UPDATE news_items SET change_version = {_CURRENT_VERSION} WHERE id = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_version_au_article
+    AFTER UPDATE OF body, author, published_at ON news_items
+    BEGIN
+        {_BUMP_VERSION}
+        UPDATE news_items SET change_version = {_CURRENT_VERSION} WHERE id = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_version_ad AFTER DELETE ON news_items
+    BEGIN
+        {_BUMP_VERSION}
+        INSERT INTO news_tombstones (item_id, url, change_version, deleted_at)
+        VALUES (OLD.id, OLD.url, {_CURRENT_VERSION}, CURRENT_TIMESTAMP);
+    END""",
+]
+POST_CREATE_DDL.extend(CHANGE_TRACKING_DDL)
+
+# Full-text index over the searchable columns. It is an external-content
+# FTS5 table (it stores only the index, the text stays in news_items), kept
+# in sync by triggers so every write path is covered. The rebuild backfills
+# rows that existed before the index did.
+SEARCH_COLUMNS = ("title",)
+_SEARCH_COLS = ", ".join(SEARCH_COLUMNS)
+_SEARCH_NEW = ", ".join(f"NEW.{name}" for name in SEARCH_COLUMNS)
+_SEARCH_OLD = ", ".join(f"OLD.{name}" for name in SEARCH_COLUMNS)
+SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS news_items_fts USING fts5(
+        {_SEARCH_COLS}, content='news_items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    "INSERT INTO news_items_fts (news_items_fts) SELECT 'rebuild' "
+    "WHERE NOT EXISTS (SELECT 1 FROM news_items_fts_docsize) "
+    "AND EXISTS (SELECT 1 FROM news_items)",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_fts_ai AFTER INSERT ON news_items
+    BEGIN
+        INSERT INTO news_items_fts (rowid, {_SEARCH_COLS}) VALUES (NEW.id, {_SEARCH_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_fts_ad AFTER DELETE ON news_items
+    BEGIN
+        INSERT INTO news_items_fts (news_items_fts, rowid, {_SEARCH_COLS})
+        VALUES ('delete', OLD.id, {_SEARCH_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_fts_au AFTER UPDATE OF {_SEARCH_COLS} ON news_items
+    BEGIN
+        INSERT INTO news_items_fts (news_items_fts, rowid, {_SEARCH_COLS})
+        VALUES ('delete', OLD.id, {_SEARCH_OLD});
+        INSERT INTO news_items_fts (rowid, {_SEARCH_COLS}) VALUES (NEW.id, {_SEARCH_NEW});
+    END""",
+]
+POST_CREATE_DDL.extend(SEARCH_DDL)
+
+# Keep news_country_counts in step with news_items on every write path, so
+# /items/stats never has to GROUP BY the whole table. The backfill only does
+# work while the counts table is still empty.
+_COUNTRY_KEY = "COALESCE({}.country, '')"
+_COUNT_UP = (
+    "INSERT INTO news_country_counts (country, items) VALUES ({key}, 1) "
+    "ON CONFLICT (country) DO UPDATE SET items = items + 1;"
+)
+_COUNT_DOWN = (
+    "UPDATE news_country_counts SET items = items - 1 WHERE country = {key}; "
+    "DELETE FROM news_country_counts WHERE country = {key} AND items <= 0;"
+)
+COUNTRY_COUNTS_DDL = [
+    "INSERT INTO news_country_counts (country, items) "
+    "SELECT COALESCE(country, ''), COUNT(*) FROM news_items "
+    "WHERE NOT EXISTS (SELECT 1 FROM news_country_counts) GROUP BY COALESCE(country, '')",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_country_ai AFTER INSERT ON news_items
+    BEGIN
+        {_COUNT_UP.format(key=_COUNTRY_KEY.format("NEW"))}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_country_ad AFTER DELETE ON news_items
+    BEGIN
+        {_COUNT_DOWN.format(key=_COUNTRY_KEY.format("OLD"))}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS news_items_country_au AFTER UPDATE OF country ON news_items
+    WHEN {_COUNTRY_KEY.format("OLD")} <> {_COUNTRY_KEY.format("NEW")}
+    BEGIN
+        {_COUNT_DOWN.format(key=_COUNTRY_KEY.format("OLD"))}
+        {_COUNT_UP.format(key=_COUNTRY_KEY.format("NEW"))}
+    END""",
+]
+POST_CREATE_DDL.extend(COUNTRY_COUNTS_DDL)
@@ -1,26 +1,104 @@
+import asyncio
 import json
 import logging
-from typing import Any, Callable, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Set, Union
 
-from app.config import NATS_URL
+from app.config import (
+    INSTANCE_ID,
+    NATS_CODEC,
+    NATS_DEDUP_WINDOW,
+    NATS_DURABLE,
+    NATS_DURABLE_SET,
+    NATS_FETCH_BATCH,
+    NATS_JETSTREAM,
+    NATS_STREAM,
+    NATS_STREAM_MAX_AGE,
+    NATS_STREAM_MAX_BYTES,
+    NATS_URL,
+)
+from app.services.codec import EncodedEvent, codec_for_content_type, get_codec, json_codec
+from app.services.metrics import (
+    NATS_HANDLER_SECONDS,
+    NATS_PUBLISH_FAILURES,
+    NATS_PUBLISH_SECONDS,
+    metrics,
+)
 
 try:
     import nats
     from nats.aio.msg import Msg as NatsMsg
+    from nats.errors import TimeoutError as NatsTimeoutError
+    from nats.js.errors import NotFoundError
 except ImportError:
     nats = None
     NatsMsg = Any
+    NatsTimeoutError = NotFoundError = Exception
 
 logger = logging.getLogger("hltv_app")
 
 NATS_SUBJECT = "items.updates"
+CONTENT_TYPE_HEADER = "Content-Type"
+
+
+def decode_message(msg: NatsMsg) -> Any:
+    """Decode an event with the codec named by its ``Content-Type`` header."""
+    content_type = (msg.headers or {}).get(CONTENT_TYPE_HEADER)
+    codec = codec_for_content_type(content_type)
+    if codec is None:
+        raise ValueError(f"unsupported content type {content_type!r}")
+    return codec.decode(msg.data)
+
+
+def _timed(handler: Callable[[NatsMsg], Any]) -> Callable[[NatsMsg], Awaitable[None]]:
+    async def timed(msg: NatsMsg) -> None:
+        started = time.perf_counter()
+        try:
+            await handler(msg)
+        finally:
+            NATS_HANDLER_SECONDS.observe(time.perf_counter() - started)
+
+    return timed
 
 
 class NatsClient:
-    def __init__(self, url: str) -> None:
+    """Core NATS pub/sub, or JetStream when ``jetstream`` is enabled.
+
+    In JetStream mode publishes wait for the stream's ack and the
+    subscription is a durable pull consumer: messages are fetched in batches,
+    handed to ``handler`` one by one, and acked only after ``on_batch``
+    confirms they were applied (a message whose handler raises is nak'd for
+    redelivery), so a restarted instance resumes from its last acked sequence.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        jetstream: bool = False,
+        stream: str = NATS_STREAM,
+        durable: str = NATS_DURABLE,
+        fetch_batch: int = NATS_FETCH_BATCH,
+        codec: str = NATS_CODEC,
+        max_age: float = NATS_STREAM_MAX_AGE,
+        max_bytes: int = NATS_STREAM_MAX_BYTES,
+    ) -> None:
         self.url = url
+        self.codec = get_codec(codec)
+        if self.codec is None:
+            logger.warning("NATS codec %r unavailable, publishing JSON", codec)
+            self.codec = json_codec
         self.nc = None
         self.sub = None
+        self.jetstream = jetstream
+        self.stream = stream
+        self.durable = durable
+        self.fetch_batch = max(1, fetch_batch)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.js: Any = None
+        self._pull_task: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
 
     async def connect(self) -> None:
         if nats is None:
@@ -32,32 +110,232 @@ class NatsClient:
         except Exception as exc:
             logger.warning("NATS connection failed: %s", exc)
             self.nc = None
+            return
+        if self.jetstream:
+            try:
+                self.js = self.nc.jetstream()
+                await self._ensure_stream()
+            except Exception as exc:
+                logger.warning("JetStream unavailable, using core NATS: %s", exc)
+                self.js = None
+
+    async def _ensure_stream(self) -> None:
+        # NATS treats max_age 0 and max_bytes -1 as unlimited.
+        limits = {
+            "max_age": max(0.0, self.max_age),
+            "max_bytes": self.max_bytes if self.max_bytes > 0 else -1,
+        }
+        try:
+            info = await self.js.stream_info(self.stream)
+        except NotFoundError:
+            await self.js.add_stream(name=self.stream, subjects=[NATS_SUBJECT], **limits)
+            logger.info("Created JetStream stream '%s'", self.stream)
+            return
+        config = info.config
+        if (config.max_age or 0.0, config.max_bytes) != (limits["max_age"], limits["max_bytes"]):
+            config.max_age, config.max_bytes = limits["max_age"], limits["max_bytes"]
+            await self.js.update_stream(config)
+            logger.info("Updated retention of JetStream stream '%s'", self.stream)
 
     async def close(self) -> None:
+        if self._pull_task is not None:
+            self._pull_task.cancel()
+            try:
+                await self._pull_task
+            except asyncio.CancelledError:
+                pass
+            self._pull_task = None
+            try:
+                await self.sub.unsubscribe()
+            except Exception:
+                pass
         if self.nc is not None:
             await self.nc.drain()
             self.nc = None
+            self.js = None
             logger.info("NATS connection closed")
 
-    async def publish(self, subject: str, payload: dict[str, Any]) -> None:
+    async def publish(self, subject: str, payload: Union[dict[str, Any], EncodedEvent]) -> None:
         if self.nc is None:
             return
+        event = payload if isinstance(payload, EncodedEvent) else EncodedEvent(payload)
+        data = event.encode(self.codec)
+        headers = {CONTENT_TYPE_HEADER: self.codec.content_type}
+        mode = "jetstream" if self.js is not None else "core"
+        started = time.perf_counter()
         try:
-            await self.nc.publish(subject, json.dumps(payload).encode())
+            if self.js is not None:
+                # Nats-Msg-Id also lets the stream drop duplicate publishes.
+                if "event_id" in event.message:
+                    headers["Nats-Msg-Id"] = event.message["event_id"]
+                await self.js.publish(subject, data, headers=headers)
+            else:
+                await self.nc.publish(subject, data, headers=headers)
         except Exception as exc:
+            NATS_PUBLISH_FAILURES.inc(mode)
             logger.warning("NATS publish failed: %s", exc)
+        else:
+            NATS_PUBLISH_SECONDS.observe(time.perf_counter() - started, mode)
+
+    async def request(
+        self, subject: str, payload: dict[str, Any], timeout: float
+    ) -> Optional[dict[str, Any]]:
+        """Core NATS request/reply; None when NATS is not connected."""
+        if self.nc is None:
+            return None
+        reply = await self.nc.request(subject, json.dumps(payload).encode(), timeout=timeout)
+        return json.loads(reply.data.decode())
+
+    async def serve(
+        self, subject: str, handler: Callable[[dict[str, Any]], Awaitable[Optional[dict[str, Any]]]]
+    ) -> None:
+        """Answer core NATS requests on ``subject``; a None result sends no reply."""
+        if self.nc is None:
+            return
+
+        async def respond(msg: NatsMsg) -> None:
+            try:
+                result = await handler(json.loads(msg.data.decode() or "{}"))
+                if result is not None and msg.reply:
+                    await msg.respond(json.dumps(result).encode())
+            except Exception as exc:
+                logger.warning("NATS request handler for '%s' failed: %s", subject, exc)
+
+        async def dispatch(msg: NatsMsg) -> None:
+            # Callbacks of one subscription run one after another; answer each
+            # request in its own task so a slow handler does not queue the rest.
+            task = asyncio.create_task(respond(msg))
+            self._handlers.add(task)
+            task.add_done_callback(self._handlers.discard)
+
+        try:
+            await self.nc.subscribe(subject, cb=dispatch)
+        except Exception as exc:
+            logger.warning("NATS subscribe failed: %s", exc)
 
     async def subscribe(
-        self, subject: str, handler: Callable[[NatsMsg], Any]
+        self,
+        subject: str,
+        handler: Callable[[NatsMsg], Any],
+        on_batch: Optional[Callable[[List[NatsMsg]], Awaitable[bool]]] = None,
     ) -> None:
         if self.nc is None:
             return
+        if metrics.enabled:
+            handler = _timed(handler)
         try:
-            self.sub = await self.nc.subscribe(subject, cb=handler)
-            logger.info("Subscribed to NATS subject '%s'", subject)
+            if self.js is not None:
+                if self.durable == NATS_DURABLE and not NATS_DURABLE_SET:
+                    logger.warning(
+                        "NATS_DURABLE is not set; consumer '%s' follows the hostname, so a "
+                        "recreated container starts a new consumer that replays the stream",
+                        self.durable,
+                    )
+                self.sub = await self.js.pull_subscribe(
+                    subject, durable=self.durable, stream=self.stream
+                )
+                self._pull_task = asyncio.create_task(self._pull_loop(handler, on_batch))
+                logger.info(
+                    "Pulling NATS subject '%s' via durable consumer '%s'", subject, self.durable
+                )
+            else:
+                self.sub = await self.nc.subscribe(subject, cb=handler)
+                logger.info("Subscribed to NATS subject '%s'", subject)
         except Exception as exc:
             logger.warning("NATS subscribe failed: %s", exc)
 
+    async def _pull_loop(
+        self,
+        handler: Callable[[NatsMsg], Any],
+        on_batch: Optional[Callable[[List[NatsMsg]], Awaitable[bool]]],
+    ) -> None:
+        while True:
+            try:
+                msgs = await self.sub.fetch(self.fetch_batch, timeout=1)
+            except (NatsTimeoutError, asyncio.TimeoutError):
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("JetStream fetch failed: %s", exc)
+                await asyncio.sleep(1)
+                continue
+            handled: List[NatsMsg] = []
+            failed: List[NatsMsg] = []
+            for msg in msgs:
+                try:
+                    await handler(msg)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    logger.warning("NATS handler failed, redelivering message: %s", exc)
+                    failed.append(msg)
+                else:
+                    handled.append(msg)
+            applied = True
+            if on_batch is not None and handled:
+                try:
+                    applied = await on_batch(handled)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    logger.warning("Applying JetStream batch failed: %s", exc)
+                    applied = False
+            for msg in msgs:
+                try:
+                    if applied and msg not in failed:
+                        await msg.ack()
+                    else:
+                        await msg.nak(delay=1)
+                except Exception as exc:
+                    logger.warning("JetStream ack failed: %s", exc)
+
+
+class EventFilter:
+    """Drops our own echoes and redelivered events before they are applied.
+
+    Events carry ``origin`` (publishing instance) and ``event_id``; ids seen
+    recently are kept in a bounded LRU so duplicates are applied only once.
+    """
+
+    def __init__(self, instance_id: str, max_seen: int) -> None:
+        self.instance_id = instance_id
+        self.max_seen = max(1, max_seen)
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self.suppressed_echo = 0
+        self.suppressed_duplicate = 0
+        self.applied = 0
+
+    def accept(self, payload: dict[str, Any]) -> bool:
+        if payload.get("origin") == self.instance_id:
+            self.suppressed_echo += 1
+            return False
+        event_id = payload.get("event_id")
+        if event_id is None:
+            return True
+        if event_id in self._seen:
+            self._seen.move_to_end(event_id)
+            self.suppressed_duplicate += 1
+            return False
+        self._seen[event_id] = None
+        if len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        return True
+
+    def forget(self, event_id: Optional[str]) -> None:
+        """Allow ``event_id`` through again, e.g. after its apply failed."""
+        self._seen.pop(event_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "instance_id": self.instance_id,
+            "suppressed_echo": self.suppressed_echo,
+            "suppressed_duplicate": self.suppressed_duplicate,
+            "applied": self.applied,
+            "tracked_ids": len(self._seen),
+        }
+
 
-nats_client = NatsClient(NATS_URL)
+nats_client = NatsClient(NATS_URL, jetstream=NATS_JETSTREAM)
+event_filter = EventFilter(INSTANCE_ID, NATS_DEDUP_WINDOW)
 
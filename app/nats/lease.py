@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, Optional
+
+from app.config import INSTANCE_ID, LEADER_LEASE, LEADER_LEASE_BUCKET, LEADER_LEASE_TTL
+from app.nats.client import NatsClient, nats_client
+
+try:
+    from nats.js.errors import BucketNotFoundError, KeyNotFoundError, KeyWrongLastSequenceError
+except ImportError:
+    BucketNotFoundError = KeyNotFoundError = KeyWrongLastSequenceError = Exception
+
+logger = logging.getLogger("hltv_app")
+
+LEASE_KEY = "fetcher"
+
+
+class LeaderLease:
+    """Leader election through a key in a NATS KV bucket whose ``max_age`` is the lease TTL.
+
+    The holder renews the key with a compare-and-set update every third of
+    the TTL; everyone else tries to create it and fails while it exists. If
+    the holder dies its key expires after at most ``ttl`` and the next
+    attempt elsewhere wins. A clean shutdown deletes the key, which the other
+    instances see through a watch and take over at once. A holder that could
+    not renew for ``ttl`` stops considering itself leader even before it
+    learns that someone else took over.
+
+    Without NATS (package missing, no connection, no JetStream) or when
+    ``enabled`` is false the instance is always leader, as before.
+    """
+
+    def __init__(
+        self, client: NatsClient, bucket: str, ttl: float, instance_id: str, enabled: bool
+    ) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.ttl = ttl
+        self.instance_id = instance_id
+        self.enabled = enabled
+        self.kv: Any = None
+        self.holder: Optional[str] = None
+        self.elections = 0
+        self._leader = False
+        self._revision: Optional[int] = None
+        self._renewed_at = 0.0
+        self._listeners: List[Callable[[bool], None]] = []
+        self._changed = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def coordinated(self) -> bool:
+        return self.kv is not None
+
+    @property
+    def is_leader(self) -> bool:
+        if not self.coordinated:
+            return True
+        return self._leader and time.monotonic() - self._renewed_at < self.ttl
+
+    def add_listener(self, listener: Callable[[bool], None]) -> None:
+        self._listeners.append(listener)
+
+    async def start(self) -> None:
+        if not self.enabled or self.client.nc is None:
+            return
+        try:
+            js = self.client.nc.jetstream()
+            try:
+                self.kv = await js.key_value(self.bucket)
+            except BucketNotFoundError:
+                self.kv = await js.create_key_value(bucket=self.bucket, ttl=self.ttl, history=1)
+        except Exception as exc:
+            logger.warning("Leader lease unavailable, running as leader: %s", exc)
+            self.kv = None
+            return
+        self._changed = asyncio.Event()
+        await self._tick()
+        self._tasks = [asyncio.create_task(self._loop()), asyncio.create_task(self._watch())]
+        logger.info("Leader lease '%s' started (ttl %ss)", self.bucket, self.ttl)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        if self.kv is not None and self._leader:
+            try:
+                await self.kv.delete(LEASE_KEY, last=self._revision)
+                logger.info("Leader lease released")
+            except Exception as exc:
+                logger.warning("Releasing leader lease failed: %s", exc)
+        self._set_leader(False)
+        self.kv = None
+
+    def _set_leader(self, leader: bool) -> None:
+        if leader == self._leader:
+            return
+        self._leader = leader
+        if leader:
+            self.elections += 1
+            self.holder = self.instance_id
+        logger.info("Leader lease %s", "acquired" if leader else "lost")
+        for listener in self._listeners:
+            listener(leader)
+
+    async def _tick(self) -> None:
+        value = self.instance_id.encode()
+        try:
+            if self._leader:
+                self._revision = await self.kv.update(LEASE_KEY, value, last=self._revision)
+            else:
+                self._revision = await self.kv.create(LEASE_KEY, value)
+            self._renewed_at = time.monotonic()
+            self._set_leader(True)
+        except KeyWrongLastSequenceError:
+            # Someone else holds (or took over) the lease.
+            self._set_leader(False)
+            try:
+                self.holder = (await self.kv.get(LEASE_KEY)).value.decode()
+            except Exception:
+                self.holder = None
+        except Exception as exc:
+            logger.warning("Leader lease renewal failed: %s", exc)
+            if self._leader and not self.is_leader:
+                self._set_leader(False)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.ttl / 3)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            await self._tick()
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                watcher = await self.kv.watch(LEASE_KEY, ignore_deletes=False)
+                async for entry in watcher:
+                    if entry is None:
+                        continue
+                    if entry.operation in ("DEL", "PURGE"):
+                        self.holder = None
+                        self._changed.set()
+                    elif entry.value:
+                        self.holder = entry.value.decode()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Leader lease watch failed: %s", exc)
+                await asyncio.sleep(self.ttl / 3)
+
+    async def current_holder(self) -> Optional[str]:
+        """Instance holding the lease right now, read from the bucket; None when
+        the key is gone (no leader, or it expired during a failover)."""
+        if not self.coordinated or self.is_leader:
+            return self.instance_id
+        try:
+            self.holder = (await self.kv.get(LEASE_KEY)).value.decode()
+        except KeyNotFoundError:
+            self.holder = None
+        return self.holder
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "coordinated": self.coordinated,
+            "instance_id": self.instance_id,
+            "is_leader": self.is_leader,
+            "holder": self.instance_id if self.is_leader else self.holder,
+            "elections": self.elections,
+            "ttl_seconds": self.ttl,
+        }
+
+
+leader_lease = LeaderLease(
+    nats_client, LEADER_LEASE_BUCKET, LEADER_LEASE_TTL, INSTANCE_ID, LEADER_LEASE
+)
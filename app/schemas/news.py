@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -29,7 +29,56 @@ class NewsRead(BaseModel):
     country: Optional[str]
     published_text: Optional[str]
     comments: Optional[int]
+    author: Optional[str] = None
+    published_at: Optional[datetime] = None
+    body: Optional[str] = None
+    change_version: Optional[int] = None
     created_at: Optional[datetime]
     updated_at: Optional[datetime]
 
 
+class NewsSearchHit(NewsRead):
+    snippet: str
+    rank: float
+
+
+class NewsChanges(BaseModel):
+    since: int
+    version: int
+    changed: List[NewsRead]
+    deleted: List[int]
+    has_more: bool
+
+
+
+class CountryStat(BaseModel):
+    country: Optional[str]
+    items: int
+
+
+class NewsStats(BaseModel):
+    total: int
+    countries: List[CountryStat]
+    top_commented: List[NewsRead]
+
+
+class NewsBulkUpdate(NewsUpdate):
+    id: int
+
+
+class NewsBulkDelete(BaseModel):
+    ids: List[int]
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    item: Optional[NewsRead] = None
+    detail: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    results: List[BulkItemResult]
+    succeeded: int
+    failed: int
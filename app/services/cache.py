@@ -0,0 +1,116 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+from app.config import READ_CACHE_MAX_BYTES, READ_CACHE_MAX_ENTRIES
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "item_ids", "order")
+
+    def __init__(
+        self,
+        body: bytes,
+        headers: Dict[str, str],
+        item_ids: Set[int],
+        order: Optional[str],
+    ) -> None:
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self.headers = headers
+        self.item_ids = item_ids
+        self.order = order
+
+
+class ReadCache:
+    """Size-bounded LRU of serialized ``/items`` and ``/items/{id}`` bodies.
+
+    Entries are dropped by :meth:`invalidate` for exactly the changes that
+    can affect them: an item entry and the list pages containing that id on
+    update; every list page on create/delete (positions shift) and on update
+    every page whose ``order`` is not plain ``"id"`` (rows can move between
+    pages of other sort keys, filters and aggregates).
+    ``generation`` lets a reader detect that a write landed while it was
+    querying, so it does not cache a stale body.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.size = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, entry: CachedResponse, generation: int) -> None:
+        if not self.enabled or generation != self.generation or len(entry.body) > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+            self.invalidations += 1
+
+    def invalidate_items(self, event: str, item_ids: Iterable[Any]) -> None:
+        self.generation += 1
+        ids = {item_id for item_id in item_ids if item_id is not None}
+        structural = event != "item.updated"
+        for key, entry in list(self._entries.items()):
+            if entry.order is None:
+                if key[1] in ids:
+                    self._drop(key)
+            elif structural or entry.order != "id" or entry.item_ids & ids:
+                self._drop(key)
+
+    def invalidate(self, event: str, payload: Any) -> None:
+        if not event.startswith("item."):
+            return
+        item_id = payload.get("id") if isinstance(payload, dict) else None
+        self.invalidate_items(event, [item_id])
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+read_cache = ReadCache(READ_CACHE_MAX_BYTES, READ_CACHE_MAX_ENTRIES)
@@ -0,0 +1,144 @@
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SUBPROTOCOL_PREFIX = "hltv."
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+class Codec:
+    """Serializes event messages; datetimes become ISO 8601 strings in every codec."""
+
+    name = "base"
+    content_type = "application/octet-stream"
+    # Binary codecs go out as binary WebSocket frames, text ones as text frames.
+    binary = True
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    def subprotocol(self) -> str:
+        return SUBPROTOCOL_PREFIX + self.name
+
+    def encode(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """``orjson`` when installed, the standard library otherwise."""
+
+    name = "json"
+    content_type = "application/json"
+    binary = False
+
+    def encode(self, obj: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+    def decode(self, data: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    @property
+    def available(self) -> bool:
+        return msgpack is not None
+
+    def encode(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, default=_default)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data)
+
+
+json_codec = JsonCodec()
+CODECS: Dict[str, Codec] = {codec.name: codec for codec in (json_codec, MsgpackCodec())}
+_BY_CONTENT_TYPE = {codec.content_type: codec for codec in CODECS.values()}
+
+
+def get_codec(name: Optional[str]) -> Optional[Codec]:
+    """Codec called ``name`` if it exists and its package is installed."""
+    codec = CODECS.get((name or "").strip().lower())
+    return codec if codec is not None and codec.available else None
+
+
+def codec_for_content_type(content_type: Optional[str]) -> Optional[Codec]:
+    """Codec for a ``Content-Type`` header; no header means JSON, as sent before codecs."""
+    if not content_type:
+        return json_codec
+    codec = _BY_CONTENT_TYPE.get(content_type.split(";", 1)[0].strip().lower())
+    return codec if codec is not None and codec.available else None
+
+
+def negotiate(
+    subprotocols: Sequence[str], requested: Optional[str]
+) -> Tuple[Optional[Codec], Optional[str]]:
+    """Pick a WebSocket codec: the first offered ``hltv.<codec>`` subprotocol we
+    support, else the ``codec`` query parameter, else JSON.
+
+    Returns ``(codec, subprotocol to accept)``; the codec is None when the
+    query parameter names a codec that is unknown or not installed.
+    """
+    for offered in subprotocols:
+        if offered.startswith(SUBPROTOCOL_PREFIX):
+            codec = get_codec(offered[len(SUBPROTOCOL_PREFIX):])
+            if codec is not None:
+                return codec, offered
+    if requested:
+        return get_codec(requested), None
+    return json_codec, None
+
+
+class EncodedEvent:
+    """An event message that is serialized at most once per codec.
+
+    Every WebSocket client and the NATS publish share the cached bytes, so
+    fanning an event out to N consumers costs one encode, not N.
+    """
+
+    __slots__ = ("message", "_encoded", "_text")
+
+    def __init__(self, message: dict[str, Any]) -> None:
+        self.message = message
+        self._encoded: Dict[str, bytes] = {}
+        self._text: Optional[str] = None
+
+    def encode(self, codec: Codec) -> bytes:
+        data = self._encoded.get(codec.name)
+        if data is None:
+            data = self._encoded[codec.name] = codec.encode(self.message)
+        return data
+
+    def frame(self, codec: Codec) -> Union[str, bytes]:
+        """WebSocket frame payload: ``bytes`` for binary codecs, ``str`` for JSON."""
+        if codec.binary:
+            return self.encode(codec)
+        if self._text is None:
+            self._text = self.encode(codec).decode()
+        return self._text
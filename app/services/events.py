@@ -1,19 +1,145 @@
-from datetime import datetime
-from typing import Any
+import asyncio
+import itertools
+import logging
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from app.config import EVENT_BATCH_MAX_SIZE, EVENT_BATCH_WINDOW_MS, INSTANCE_ID
 from app.nats.client import NATS_SUBJECT, nats_client
-from app.ws.manager import ws_manager
-
-def _to_jsonable(obj: Any) -> Any:
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    if isinstance(obj, dict):
-        return {k: _to_jsonable(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_to_jsonable(v) for v in obj]
-    return obj
-
-async def broadcast_change(event: str, payload: dict[str, Any]) -> None:
-    safe_payload = _to_jsonable(payload)
-    await ws_manager.broadcast({"event": event, "data": safe_payload})
-    await nats_client.publish(NATS_SUBJECT, {"event": event, "data": safe_payload})
+from app.services.cache import read_cache
+from app.services.codec import EncodedEvent
+from app.ws.manager import BATCH_EVENT, ws_manager
+
+logger = logging.getLogger("hltv_app")
+
+
+def make_event(event: str, data: Any) -> dict[str, Any]:
+    return {"event": event, "data": data, "origin": INSTANCE_ID, "event_id": uuid.uuid4().hex}
+
+
+class EventBatcher:
+    """Collects changes for ``window`` seconds and flushes them as one batch.
+
+    Repeated changes to the same item id are merged while they wait: updates
+    fold into a pending create/update and a delete replaces whatever was
+    queued for that id. Events without an id (``task.completed``) are kept
+    as-is. A batch is flushed early once it holds ``max_size`` entries.
+    The routing country of each queued entry is kept alongside it.
+    """
+
+    def __init__(self, window: float, max_size: int) -> None:
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._pending: "OrderedDict[Hashable, dict[str, Any]]" = OrderedDict()
+        self._countries: Dict[Hashable, Optional[str]] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._seq = itertools.count()
+        self.merged = 0
+        self.flushed_batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _merge(
+        self, key: Hashable, event: str, data: dict[str, Any], country: Optional[str]
+    ) -> None:
+        queued = self._pending.get(key)
+        if queued is None:
+            self._pending[key] = make_event(event, data)
+            self._countries[key] = country
+            return
+        self.merged += 1
+        if event == "item.updated" and queued["event"] in ("item.created", "item.updated"):
+            queued["data"] = {**queued["data"], **data}
+            if country is not None:
+                self._countries[key] = country
+        else:
+            del self._pending[key]
+            self._pending[key] = make_event(event, data)
+            self._countries[key] = country
+
+    async def add(self, event: str, data: dict[str, Any], country: Optional[str] = None) -> None:
+        item_id = data.get("id") if event.startswith("item.") else None
+        key = ("item", item_id) if item_id is not None else ("seq", next(self._seq))
+        self._merge(key, event, data, country)
+        if len(self._pending) >= self.max_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        events = list(self._pending.values())
+        countries = [self._countries.get(key) for key in self._pending]
+        self._pending.clear()
+        self._countries.clear()
+        self.flushed_batches += 1
+        try:
+            await _publish_batch(events, countries)
+        except Exception as exc:
+            logger.warning("Event batch publish failed: %s", exc)
+
+
+async def _publish(message: dict[str, Any], country: Optional[str] = None) -> None:
+    # Encoded once per codec; WebSocket clients and NATS share the bytes.
+    event = EncodedEvent(message)
+    await ws_manager.broadcast(event, country)
+    await nats_client.publish(NATS_SUBJECT, event)
+
+
+async def _publish_batch(
+    events: list[dict[str, Any]], countries: Optional[Sequence[Optional[str]]] = None
+) -> None:
+    batch = EncodedEvent(make_event(BATCH_EVENT, events))
+    await ws_manager.broadcast_batch(batch, countries)
+    await nats_client.publish(NATS_SUBJECT, batch)
+
+
+event_batcher = EventBatcher(EVENT_BATCH_WINDOW_MS / 1000, EVENT_BATCH_MAX_SIZE)
+
+
+async def broadcast_change(
+    event: str, payload: dict[str, Any], country: Optional[str] = None
+) -> None:
+    """Publish one change; datetimes in ``payload`` are encoded by the codec.
+
+    ``country`` routes WebSocket subscriptions when ``payload`` has no
+    country of its own (partial updates, deletes); it is not sent.
+    """
+    read_cache.invalidate(event, payload)
+    if event_batcher.enabled:
+        await event_batcher.add(event, payload, country)
+        return
+    await _publish(make_event(event, payload), country)
+
 
+async def broadcast_changes(
+    changes: List[Tuple[str, dict[str, Any]]],
+    countries: Optional[Dict[Any, Optional[str]]] = None,
+) -> None:
+    """Publish many changes as a single ``batch`` message; ``countries`` maps
+    item ids to routing countries as in :func:`broadcast_change`."""
+    if not changes:
+        return
+    by_event: dict[str, list[Any]] = {}
+    for event, payload in changes:
+        by_event.setdefault(event, []).append(payload.get("id"))
+    for event, item_ids in by_event.items():
+        read_cache.invalidate_items(event, item_ids)
+    hints = [(countries or {}).get(payload.get("id")) for _, payload in changes]
+    if event_batcher.enabled:
+        for (event, payload), country in zip(changes, hints):
+            await event_batcher.add(event, payload, country)
+        return
+    await _publish_batch([make_event(event, payload) for event, payload in changes], hints)
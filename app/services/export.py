@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from sqlalchemy import select
+
+from app.config import EXPORT_CHUNK_ROWS
+from app.db.session import ReadSessionMaker
+from app.models.news import NewsItem
+from app.schemas.news import NewsRead
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+EXPORT_COLUMNS = tuple(NewsRead.model_fields)
+
+
+def _cell(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode_ndjson(rows: Sequence[Any]) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(_cell, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _encode_csv(rows: Sequence[Any], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([_cell(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def export_news(
+    fmt: str,
+    since: Optional[int] = None,
+    country: Optional[str] = None,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """Yield the news table as NDJSON or CSV, ``EXPORT_CHUNK_ROWS`` rows at a time.
+
+    Rows come from a streaming cursor in one read transaction, so the export
+    is a consistent snapshot and only one chunk is held in memory. With
+    ``compress`` the chunks are gzip-encoded as they are produced.
+    """
+    stmt = select(*(getattr(NewsItem, name) for name in EXPORT_COLUMNS)).order_by(NewsItem.id)
+    if since is not None:
+        stmt = stmt.where(NewsItem.change_version > since)
+    if country is not None:
+        stmt = stmt.where(NewsItem.country == country)
+
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    header = fmt == "csv"
+    if header:
+        # The header goes out even when nothing matches.
+        chunk = _encode_csv([], header=True).encode()
+        yield gzip.compress(chunk) if gzip else chunk
+    async with ReadSessionMaker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions():
+            text = _encode_csv(rows, header=False) if fmt == "csv" else _encode_ndjson(rows)
+            chunk = text.encode()
+            if gzip:
+                chunk = gzip.compress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
+    if gzip:
+        yield gzip.flush()
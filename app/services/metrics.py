@@ -0,0 +1,239 @@
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from app.config import METRICS_ENABLED
+
+# Seconds; spans sub-millisecond queries up to multi-second page loads.
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(
+        self, registry: "MetricsRegistry", name: str, help_text: str, labels: Sequence[str]
+    ) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if self.registry.enabled:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Read at scrape time from ``read()``, so keeping it current costs nothing."""
+
+    kind = "gauge"
+
+    def __init__(self, *args: Any, read: Callable[[], float]) -> None:
+        super().__init__(*args)
+        self.read = read
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_number(self.read())}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args: Any, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(*args)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _number(bound)
+                labels = _labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class MetricsRegistry:
+    """Minimal in-process Prometheus registry.
+
+    Recording is a dict lookup and a bisect per observation; with
+    ``enabled`` false every record call returns immediately and
+    :meth:`render` is not served.
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._metrics: List[_Metric] = []
+
+    def _add(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self, name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        return self._add(Gauge(self, name, help_text, (), read=read))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(self, name, help_text, labels, buckets=buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(METRICS_ENABLED)
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "hltv_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+HTTP_REQUESTS = metrics.counter(
+    "hltv_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+DB_QUERY_SECONDS = metrics.histogram(
+    "hltv_db_query_duration_seconds", "SQL statement execution time.", ("pool", "statement")
+)
+FETCH_SECONDS = metrics.histogram(
+    "hltv_fetch_duration_seconds", "Front-page fetch time per engine.", ("engine",)
+)
+FETCH_FAILURES = metrics.counter(
+    "hltv_fetch_failures_total", "Failed front-page fetches per engine.", ("engine",)
+)
+FETCH_PHASE_SECONDS = metrics.histogram(
+    "hltv_fetch_phase_duration_seconds",
+    "Fetch phases: browser launch, navigation and extraction.",
+    ("engine", "phase"),
+)
+SYNC_UPSERT_SECONDS = metrics.histogram(
+    "hltv_sync_upsert_duration_seconds", "Upsert of one scrape into the database."
+)
+WS_BROADCAST_SECONDS = metrics.histogram(
+    "hltv_ws_broadcast_duration_seconds", "WebSocket fan-out (encode and enqueue).", ("kind",)
+)
+NATS_PUBLISH_SECONDS = metrics.histogram(
+    "hltv_nats_publish_duration_seconds", "NATS publish latency.", ("mode",)
+)
+NATS_PUBLISH_FAILURES = metrics.counter(
+    "hltv_nats_publish_failures_total", "NATS publishes that raised.", ("mode",)
+)
+NATS_HANDLER_SECONDS = metrics.histogram(
+    "hltv_nats_handler_duration_seconds", "Time spent handling one received NATS message."
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests by their route template.
+
+    The route is read from the scope after routing, so ``/items/{item_id}``
+    is one series however many ids are requested.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_status(message: dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method, path)
+            HTTP_REQUESTS.inc(method, path, str(status))
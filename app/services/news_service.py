@@ -1,8 +1,36 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.news import NewsItem
+from app.models.news import (
+    CONTENT_FIELDS,
+    ChangeSequence,
+    CountryCount,
+    NewsItem,
+    NewsTombstone,
+    compute_content_hash,
+)
+
+# Keeps each multi-row INSERT well below SQLite's bound-parameter limit.
+UPSERT_CHUNK_SIZE = 500
+
+
+@dataclass
+class SyncResult:
+    created: List[NewsItem] = field(default_factory=list)
+    updated: List[NewsItem] = field(default_factory=list)
+    unchanged: List[NewsItem] = field(default_factory=list)
+    # item id -> fields that differ from the stored row, for updated items only
+    changes: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def stored(self) -> List[NewsItem]:
+        return self.created + self.updated + self.unchanged
 
 
 async def get_news_or_404(session: AsyncSession, item_id: int) -> NewsItem:
@@ -12,3 +40,339 @@ async def get_news_or_404(session: AsyncSession, item_id: int) -> NewsItem:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
+
+def _merge_entry(entry: dict[str, Any], existing: NewsItem | None) -> dict[str, Any]:
+    if existing is None:
+        return {
+            "title": entry.get("title") or "Untitled",
+            "url": entry["url"],
+            "country": entry.get("country"),
+            "published_text": entry.get("published_text"),
+            "comments": entry.get("comments"),
+        }
+    return {
+        "title": entry.get("title") or existing.title,
+        "url": existing.url,
+        "country": entry.get("country") or existing.country,
+        "published_text": entry.get("published_text") or existing.published_text,
+        "comments": entry.get("comments", existing.comments),
+    }
+
+
+async def _reload_versions(session: AsyncSession, item_ids: List[int]) -> None:
+    # RETURNING and flush do not see the change_version set by AFTER triggers.
+    for start in range(0, len(item_ids), UPSERT_CHUNK_SIZE):
+        await session.execute(
+            select(NewsItem)
+            .where(NewsItem.id.in_(item_ids[start : start + UPSERT_CHUNK_SIZE]))
+            .execution_options(populate_existing=True)
+        )
+
+
+async def bulk_upsert_news(
+    session: AsyncSession, entries: Iterable[dict[str, Any]]
+) -> SyncResult:
+    """Upsert scraped entries keyed by ``url`` in the caller's transaction.
+
+    Existing rows are loaded with a single ``IN`` lookup and compared by
+    content hash; only new or changed rows are sent to
+    ``INSERT ... ON CONFLICT(url) DO UPDATE``.
+    """
+    by_url: dict[str, dict[str, Any]] = {}
+    for entry in entries:
+        if entry.get("url") and entry["url"] not in by_url:
+            by_url[entry["url"]] = entry
+
+    result = SyncResult()
+    if not by_url:
+        return result
+
+    existing: dict[str, NewsItem] = {}
+    urls = list(by_url)
+    for start in range(0, len(urls), UPSERT_CHUNK_SIZE):
+        rows = await session.scalars(
+            select(NewsItem).where(NewsItem.url.in_(urls[start : start + UPSERT_CHUNK_SIZE]))
+        )
+        existing.update((item.url, item) for item in rows)
+
+    now = datetime.now(timezone.utc)
+    pending: List[dict[str, Any]] = []
+    changed_by_url: Dict[str, Dict[str, Any]] = {}
+    for url, entry in by_url.items():
+        current = existing.get(url)
+        values = _merge_entry(entry, current)
+        values["content_hash"] = compute_content_hash(values)
+        if current is not None:
+            stored_hash = current.content_hash or compute_content_hash(
+                {name: getattr(current, name) for name in CONTENT_FIELDS}
+            )
+            if stored_hash == values["content_hash"]:
+                result.unchanged.append(current)
+                continue
+            changed_by_url[url] = {
+                name: values[name]
+                for name in CONTENT_FIELDS
+                if getattr(current, name) != values[name]
+            }
+        pending.append({**values, "created_at": now, "updated_at": now})
+
+    for start in range(0, len(pending), UPSERT_CHUNK_SIZE):
+        stmt = sqlite_insert(NewsItem).values(pending[start : start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[NewsItem.url],
+            set_={
+                name: getattr(stmt.excluded, name)
+                for name in (*CONTENT_FIELDS, "content_hash", "updated_at")
+            },
+        )
+        rows = await session.scalars(
+            stmt.returning(NewsItem), execution_options={"populate_existing": True}
+        )
+        for item in rows:
+            if item.url in existing:
+                result.updated.append(item)
+                result.changes[item.id] = {**changed_by_url[item.url], "updated_at": item.updated_at}
+            else:
+                result.created.append(item)
+
+    await _reload_versions(session, [item.id for item in result.created + result.updated])
+    for item in result.updated:
+        result.changes[item.id]["change_version"] = item.change_version
+
+    return result
+
+
+async def get_news_stats(session: AsyncSession, top: int) -> dict[str, Any]:
+    """Per-country counts from the trigger-maintained table and the ``top``
+    most commented items straight off the ``(comments, id)`` index."""
+    counts = (
+        await session.scalars(
+            select(CountryCount).order_by(CountryCount.items.desc(), CountryCount.country)
+        )
+    ).all()
+    top_commented = (
+        await session.scalars(
+            select(NewsItem)
+            .where(NewsItem.comments.is_not(None))
+            .order_by(NewsItem.comments.desc(), NewsItem.id.desc())
+            .limit(top)
+        )
+    ).all()
+    return {
+        "total": sum(row.items for row in counts),
+        "countries": [{"country": row.country or None, "items": row.items} for row in counts],
+        "top_commented": top_commented,
+    }
+
+
+def _bulk_result(
+    index: int,
+    status: str,
+    item: NewsItem | None = None,
+    item_id: int | None = None,
+    detail: str | None = None,
+) -> dict[str, Any]:
+    return {
+        "index": index,
+        "status": status,
+        "id": item.id if item is not None else item_id,
+        "item": item,
+        "detail": detail,
+    }
+
+
+async def _load_by_ids(session: AsyncSession, item_ids: Iterable[int]) -> dict[int, NewsItem]:
+    ids = list(dict.fromkeys(item_ids))
+    loaded: dict[int, NewsItem] = {}
+    for start in range(0, len(ids), UPSERT_CHUNK_SIZE):
+        rows = await session.scalars(
+            select(NewsItem).where(NewsItem.id.in_(ids[start : start + UPSERT_CHUNK_SIZE]))
+        )
+        loaded.update((item.id, item) for item in rows)
+    return loaded
+
+
+async def _url_owners(session: AsyncSession, urls: Iterable[str]) -> dict[str, int]:
+    wanted = list(dict.fromkeys(urls))
+    owners: dict[str, int] = {}
+    for start in range(0, len(wanted), UPSERT_CHUNK_SIZE):
+        rows = await session.execute(
+            select(NewsItem.url, NewsItem.id).where(
+                NewsItem.url.in_(wanted[start : start + UPSERT_CHUNK_SIZE])
+            )
+        )
+        owners.update((url, item_id) for url, item_id in rows)
+    return owners
+
+
+async def bulk_create_news(
+    session: AsyncSession, entries: List[dict[str, Any]]
+) -> List[dict[str, Any]]:
+    """Insert many items with multi-row INSERTs; one result per entry.
+
+    Entries whose ``url`` already exists, or repeats an earlier entry, are
+    reported as ``conflict`` and the rest are still inserted.
+    """
+    results: List[dict[str, Any] | None] = [None] * len(entries)
+    taken = await _url_owners(session, (entry["url"] for entry in entries))
+    now = datetime.now(timezone.utc)
+    pending: dict[str, tuple[int, dict[str, Any]]] = {}
+    for index, entry in enumerate(entries):
+        if entry["url"] in taken:
+            results[index] = _bulk_result(
+                index,
+                "conflict",
+                item_id=taken[entry["url"]],
+                detail="Item with this URL already exists",
+            )
+        elif entry["url"] in pending:
+            results[index] = _bulk_result(index, "conflict", detail="Duplicate URL in request")
+        else:
+            values = _merge_entry(entry, None)
+            values["content_hash"] = compute_content_hash(values)
+            pending[entry["url"]] = (index, {**values, "created_at": now, "updated_at": now})
+
+    rows = [values for _, values in pending.values()]
+    created: List[NewsItem] = []
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = (
+            sqlite_insert(NewsItem)
+            .values(rows[start : start + UPSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing(index_elements=[NewsItem.url])
+            .returning(NewsItem)
+        )
+        created.extend(await session.scalars(stmt))
+    await _reload_versions(session, [item.id for item in created])
+    for item in created:
+        index = pending[item.url][0]
+        results[index] = _bulk_result(index, "created", item)
+    return [
+        result or _bulk_result(index, "conflict", detail="Item with this URL already exists")
+        for index, result in enumerate(results)
+    ]
+
+
+async def bulk_update_news(
+    session: AsyncSession, entries: List[dict[str, Any]]
+) -> List[dict[str, Any]]:
+    """Apply partial updates keyed by ``id`` and flush them together.
+
+    Missing ids are reported as ``not_found``; moving an item to a ``url``
+    that another item holds (or held at the start of the request) is a
+    ``conflict`` and leaves that item untouched.
+    """
+    items = await _load_by_ids(session, (entry["id"] for entry in entries))
+    owners = await _url_owners(session, (entry["url"] for entry in entries if entry.get("url")))
+    owners.update((item.url, item.id) for item in items.values())
+    results: List[dict[str, Any]] = []
+    for index, entry in enumerate(entries):
+        item = items.get(entry["id"])
+        if item is None:
+            results.append(
+                _bulk_result(index, "not_found", item_id=entry["id"], detail="Item not found")
+            )
+            continue
+        fields = {name: value for name, value in entry.items() if name != "id"}
+        url = fields.get("url")
+        if url is not None and owners.setdefault(url, item.id) != item.id:
+            results.append(
+                _bulk_result(index, "conflict", item, detail="Item with this URL already exists")
+            )
+            continue
+        result = _bulk_result(index, "updated", item)
+        if url is not None and url != item.url:
+            result["previous_url"] = item.url
+        for name, value in fields.items():
+            setattr(item, name, value)
+        results.append(result)
+    await session.flush()
+    await _reload_versions(
+        session, list({result["id"] for result in results if result["status"] == "updated"})
+    )
+    return results
+
+
+async def bulk_delete_news(session: AsyncSession, item_ids: List[int]) -> List[dict[str, Any]]:
+    # id -> (url, country) of the rows that existed, for the delete events
+    existing: dict[int, Tuple[str, Optional[str]]] = {}
+    unique = list(dict.fromkeys(item_ids))
+    for start in range(0, len(unique), UPSERT_CHUNK_SIZE):
+        chunk = unique[start : start + UPSERT_CHUNK_SIZE]
+        rows = await session.execute(
+            select(NewsItem.id, NewsItem.url, NewsItem.country).where(NewsItem.id.in_(chunk))
+        )
+        existing.update((item_id, (url, country)) for item_id, url, country in rows)
+        await session.execute(delete(NewsItem).where(NewsItem.id.in_(chunk)))
+    return [
+        {
+            **_bulk_result(index, "deleted", item_id=item_id),
+            "url": existing[item_id][0],
+            "country": existing[item_id][1],
+        }
+        if item_id in existing
+        else _bulk_result(index, "not_found", item_id=item_id, detail="Item not found")
+        for index, item_id in enumerate(item_ids)
+    ]
+
+
+async def store_article_details(
+    session: AsyncSession, details: Dict[int, Dict[str, Any]]
+) -> List[NewsItem]:
+    """Write enrichment results (``ARTICLE_FIELDS`` plus ``article_hash``) keyed by
+    item id; items deleted in the meantime are skipped."""
+    items = await _load_by_ids(session, details)
+    now = datetime.now(timezone.utc)
+    for item_id, item in items.items():
+        for name, value in details[item_id].items():
+            setattr(item, name, value)
+        item.enriched_at = now
+        item.updated_at = now
+    await session.flush()
+    await _reload_versions(session, list(items))
+    return list(items.values())
+
+
+async def get_changes_since(session: AsyncSession, since: int, limit: int) -> dict[str, Any]:
+    """Rows and tombstones with ``change_version > since``, oldest first.
+
+    At most ``limit`` changes are returned; ``version`` is the cursor to pass
+    as ``since`` next time.
+    """
+    rows = (
+        await session.scalars(
+            select(NewsItem)
+            .where(NewsItem.change_version > since)
+            .order_by(NewsItem.change_version)
+            .limit(limit + 1)
+        )
+    ).all()
+    tombstones = (
+        await session.scalars(
+            select(NewsTombstone)
+            .where(NewsTombstone.change_version > since)
+            .order_by(NewsTombstone.change_version)
+            .limit(limit + 1)
+        )
+    ).all()
+    merged = sorted([*rows, *tombstones], key=lambda entry: entry.change_version)
+    page, has_more = merged[:limit], len(merged) > limit
+    # SQLite reuses the largest rowid after a delete, so a row created later in
+    # the page can carry a deleted item's id; its tombstone is superseded.
+    live = {entry.id for entry in page if isinstance(entry, NewsItem)}
+    if page:
+        version = page[-1].change_version
+    else:
+        version = await session.scalar(
+            select(ChangeSequence.version).where(ChangeSequence.id == 1)
+        ) or since
+    return {
+        "since": since,
+        "version": version,
+        "changed": [entry for entry in page if isinstance(entry, NewsItem)],
+        "deleted": [
+            entry.item_id
+            for entry in page
+            if isinstance(entry, NewsTombstone) and entry.item_id not in live
+        ],
+        "has_more": has_more,
+    }
@@ -0,0 +1,103 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Select, and_, or_
+
+from app.models.news import NewsItem
+
+SORT_KEYS = ("id", "updated_at", "comments")
+
+
+def encode_cursor(sort: str, direction: str, row: NewsItem) -> str:
+    values: list[Any] = [row.id]
+    if sort != "id":
+        value = getattr(row, sort)
+        values = [value.isoformat() if isinstance(value, datetime) else value, row.id]
+    raw = json.dumps({"s": sort, "d": direction, "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str, list[Any]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort, direction, values = data["s"], data["d"], list(data["v"])
+        if sort not in SORT_KEYS or direction not in ("next", "prev"):
+            raise ValueError(cursor)
+        if sort == "updated_at":
+            values[0] = datetime.fromisoformat(values[0]) if values[0] else None
+            int(values[1])
+        elif sort == "comments":
+            values[0] = int(values[0]) if values[0] is not None else None
+            int(values[1])
+        else:
+            int(values[0])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort, direction, values
+
+
+def _seek(column: Any, value: Any, item_id: int, backwards: bool) -> Any:
+    # Rows after (value, item_id) in (column DESC, id DESC) order, or before
+    # it when going backwards. NULLs sort lowest, i.e. last on a DESC page.
+    if value is None:
+        if backwards:
+            return or_(column.is_not(None), and_(column.is_(None), NewsItem.id > item_id))
+        return and_(column.is_(None), NewsItem.id < item_id)
+    if backwards:
+        return or_(column > value, and_(column == value, NewsItem.id > item_id))
+    return or_(
+        column < value,
+        and_(column == value, NewsItem.id < item_id),
+        column.is_(None),
+    )
+
+
+def apply_keyset(
+    stmt: Select, sort: str, direction: Optional[str], values: Optional[list[Any]]
+) -> Select:
+    """Order ``stmt`` by ``sort`` descending and seek past the cursor position.
+
+    ``prev`` pages are selected in ascending order so LIMIT keeps the rows
+    adjacent to the cursor; callers reverse them with :func:`page_rows`.
+    """
+    backwards = direction == "prev"
+    if sort == "id":
+        order = (NewsItem.id,)
+    else:
+        order = (getattr(NewsItem, sort), NewsItem.id)
+
+    if values is not None:
+        if sort == "id":
+            (item_id,) = values
+            stmt = stmt.where(NewsItem.id > item_id if backwards else NewsItem.id < item_id)
+        else:
+            stmt = stmt.where(_seek(order[0], values[0], values[1], backwards))
+
+    if backwards:
+        return stmt.order_by(*(col.asc() for col in order))
+    return stmt.order_by(*(col.desc() for col in order))
+
+
+def page_rows(
+    rows: Sequence[NewsItem],
+    limit: int,
+    sort: str,
+    direction: Optional[str],
+    has_previous: bool,
+) -> tuple[list[NewsItem], Optional[str], Optional[str]]:
+    """Trim the ``limit + 1`` probe row and build the neighbouring cursors."""
+    items = list(rows[:limit])
+    has_more = len(rows) > limit
+    if direction == "prev":
+        items.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, has_previous
+
+    next_cursor = encode_cursor(sort, "next", items[-1]) if items and has_next else None
+    prev_cursor = encode_cursor(sort, "prev", items[0]) if items and has_prev else None
+    return items, next_cursor, prev_cursor
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import NATS_APPLY_BATCH_SIZE, NATS_APPLY_MAX_DELAY_MS
+from app.db.writer import DatabaseWriter, db_writer
+from app.models.news import ARTICLE_FIELDS, CONTENT_FIELDS, NewsItem, compute_content_hash
+from app.services.cache import read_cache
+from app.services.news_service import UPSERT_CHUNK_SIZE
+
+logger = logging.getLogger("hltv_app")
+
+
+def _parse_datetime(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _article_fields(data: dict[str, Any]) -> dict[str, Any]:
+    fields = {name: data[name] for name in ARTICLE_FIELDS if name in data}
+    if isinstance(fields.get("published_at"), str):
+        fields["published_at"] = _parse_datetime(fields["published_at"])
+    return fields
+
+
+class ReplicationApplier:
+    """Buffers replicated item events and applies them in one transaction.
+
+    Items are matched by ``url``, never by id: ids are local to each
+    instance's database and drift with insert order, missed creates and
+    replays. Update and delete events therefore carry the item's ``url``
+    (plus ``previous_url`` when an update moves it); events without one are
+    skipped. Within a batch the last write per url wins: updates are merged
+    field by field (into the pending create, if there is one), a delete
+    discards any pending create or update, and a create after a delete
+    replaces the row because deletes run before inserts. Other creates are
+    skipped when the url already exists. A batch is applied once
+    it holds ``max_batch`` events or ``max_delay`` seconds after its first
+    event.
+
+    A failed apply is remembered until :meth:`commit`, so a JetStream fetch
+    batch is only acked if every flush made while it was buffered succeeded.
+    """
+
+    def __init__(
+        self,
+        writer: DatabaseWriter,
+        max_batch: int,
+        max_delay: float,
+    ) -> None:
+        self.writer = writer
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self._creates: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+        # url the item had when the batch started -> fields to set
+        self._updates: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+        self._deletes: set[str] = set()
+        # url an update moved an item to -> its url at the start of the batch
+        self._moved: dict[str, str] = {}
+        self._buffered = 0
+        self._failed = False
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def _buffer(self, event: Optional[str], data: Any) -> bool:
+        if not isinstance(data, dict):
+            return False
+        if event == "item.created" and isinstance(data.get("url"), str):
+            self._updates.pop(data["url"], None)
+            self._creates[data["url"]] = {**data, **_article_fields(data)}
+            return True
+        url = data.get("previous_url") or data.get("url")
+        if not isinstance(url, str):
+            return False
+        url = self._moved.get(url, url)
+        if event == "item.updated":
+            fields = {name: data[name] for name in CONTENT_FIELDS if name in data}
+            fields.update(_article_fields(data))
+            moved_to = None
+            if data.get("previous_url") and isinstance(data.get("url"), str):
+                moved_to = data["url"]
+            if url in self._creates:
+                created = self._creates.pop(url) if moved_to else self._creates[url]
+                created.update(fields)
+                if moved_to:
+                    created["url"] = moved_to
+                    self._creates[moved_to] = created
+                return True
+            if url in self._deletes:
+                return False
+            if moved_to:
+                fields["url"] = moved_to
+                self._moved[moved_to] = url
+            self._updates.setdefault(url, {}).update(fields)
+        elif event == "item.deleted":
+            self._creates.pop(url, None)
+            self._updates.pop(url, None)
+            self._deletes.add(url)
+        else:
+            return False
+        return True
+
+    async def submit(self, event: Optional[str], data: Any) -> None:
+        if not self._buffer(event, data):
+            return
+        self._buffered += 1
+        if self._buffered >= self.max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> bool:
+        """Apply everything buffered so far; returns False if the apply failed."""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffered:
+            return True
+        creates, updates, deletes = list(self._creates.values()), self._updates, self._deletes
+        self._creates, self._updates, self._deletes = OrderedDict(), OrderedDict(), set()
+        self._moved = {}
+        self._buffered = 0
+        async with self._lock:
+            try:
+                await self._apply(creates, updates, deletes)
+            except Exception as exc:
+                logger.warning("Applying NATS batch failed: %s", exc)
+                self._failed = True
+                return False
+        return True
+
+    async def commit(self) -> bool:
+        """Flush and report whether everything submitted since the last commit
+        was applied, including batches flushed early by size or delay."""
+        applied = await self.flush() and not self._failed
+        self._failed = False
+        return applied
+
+    async def _apply(
+        self,
+        creates: list[dict[str, Any]],
+        updates: "OrderedDict[str, dict[str, Any]]",
+        deletes: set[str],
+    ) -> None:
+        now = datetime.now(timezone.utc)
+        table = NewsItem.__table__
+
+        async def resolve(session: AsyncSession, urls: list[str]) -> dict[str, int]:
+            # This database's ids for ``urls``; unknown urls are left out.
+            ids: dict[str, int] = {}
+            for start in range(0, len(urls), UPSERT_CHUNK_SIZE):
+                rows = await session.execute(
+                    select(NewsItem.url, NewsItem.id).where(
+                        NewsItem.url.in_(urls[start : start + UPSERT_CHUNK_SIZE])
+                    )
+                )
+                ids.update((url, item_id) for url, item_id in rows)
+            return ids
+
+        async def write(session: AsyncSession) -> tuple[list[int], list[int]]:
+            # Deletes first, so a url deleted and created again in the batch ends
+            # up with the new row.
+            deleted = list((await resolve(session, list(deletes))).values())
+            if deleted:
+                await session.execute(delete(NewsItem).where(NewsItem.id.in_(deleted)))
+            if creates:
+                rows = []
+                for data in creates:
+                    values = {
+                        "title": data.get("title", "Untitled"),
+                        "url": data["url"],
+                        "country": data.get("country"),
+                        "published_text": data.get("published_text"),
+                        "comments": data.get("comments"),
+                    }
+                    rows.append(
+                        {
+                            **values,
+                            **{name: data.get(name) for name in ARTICLE_FIELDS},
+                            "content_hash": compute_content_hash(values),
+                            "created_at": now,
+                            "updated_at": now,
+                        }
+                    )
+                for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+                    await session.execute(
+                        sqlite_insert(NewsItem)
+                        .values(rows[start : start + UPSERT_CHUNK_SIZE])
+                        .on_conflict_do_nothing(index_elements=[NewsItem.url])
+                    )
+            ids = await resolve(session, list(updates))
+            # One executemany per distinct set of updated columns. Partial
+            # content updates invalidate the stored hash; the next sync
+            # recomputes it.
+            by_columns: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+            for url, fields in updates.items():
+                if url in ids:
+                    by_columns.setdefault(tuple(sorted(fields)), []).append(
+                        {"_id": ids[url], **fields}
+                    )
+            for columns, params in by_columns.items():
+                stmt = (
+                    update(table)
+                    .where(table.c.id == bindparam("_id"))
+                    .values(
+                        {
+                            **{name: bindparam(name) for name in columns},
+                            "updated_at": now,
+                        }
+                    )
+                )
+                if set(columns) & set(CONTENT_FIELDS):
+                    stmt = stmt.values(content_hash=None)
+                await session.execute(stmt, params)
+            return list(ids.values()), deleted
+
+        updated, deleted = await self.writer.run(write)
+        if creates:
+            read_cache.invalidate_items("item.created", [])
+        if updated:
+            read_cache.invalidate_items("item.updated", updated)
+        if deleted:
+            read_cache.invalidate_items("item.deleted", deleted)
+        logger.info(
+            "Applied NATS batch: created=%s updated=%s deleted=%s",
+            len(creates),
+            len(updated),
+            len(deleted),
+        )
+
+
+replication_applier = ReplicationApplier(
+    db_writer, NATS_APPLY_BATCH_SIZE, NATS_APPLY_MAX_DELAY_MS / 1000
+)
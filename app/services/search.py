@@ -0,0 +1,83 @@
+import html
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import column, func, literal_column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import SEARCH_RANK_WINDOW
+from app.models.news import NewsItem
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+SNIPPET_TOKENS = 12
+# FTS5 wraps hits in these private-use characters; the title text is escaped
+# before they become markup, so the snippet is safe to render as HTML.
+_HIT_START = "\ue000"
+_HIT_END = "\ue001"
+
+_fts = table("news_items_fts", column("rowid"), column("rank"))
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def highlight_snippet(raw: str) -> str:
+    """HTML-escape an FTS5 snippet, then mark its hits with ``<mark>``."""
+    escaped = html.escape(raw, quote=False)
+    return escaped.replace(_HIT_START, SNIPPET_START).replace(_HIT_END, SNIPPET_END)
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, the last
+    one as a prefix so partially typed words find results.
+
+    Words are quoted, so FTS5 operators and punctuation in ``q`` are never
+    interpreted as query syntax.
+    """
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+async def search_news(
+    session: AsyncSession,
+    q: str,
+    limit: int,
+    offset: int = 0,
+    rank_window: int = SEARCH_RANK_WINDOW,
+) -> List[Tuple[NewsItem, str, float]]:
+    """Best matches first (bm25), each with a highlighted snippet and its rank.
+
+    Scoring every match of a common word costs time proportional to the
+    number of matches, so with ``rank_window`` only the newest that-many
+    matching rows are ranked (a rowid range FTS5 can apply while scanning).
+    """
+    match = build_match_query(q)
+    if match is None:
+        return []
+    fts_name = literal_column("news_items_fts")
+    matches = fts_name.op("MATCH")(match)
+    snippet = func.snippet(fts_name, -1, _HIT_START, _HIT_END, "…", SNIPPET_TOKENS)
+    stmt = (
+        select(NewsItem, snippet, _fts.c.rank)
+        .join(_fts, _fts.c.rowid == NewsItem.id)
+        .where(matches)
+        .order_by(_fts.c.rank, NewsItem.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    if rank_window > 0:
+        newest = (
+            select(_fts.c.rowid)
+            .where(matches)
+            .order_by(_fts.c.rowid.desc())
+            .limit(rank_window)
+            .subquery()
+        )
+        stmt = stmt.where(_fts.c.rowid >= select(func.min(newest.c.rowid)).scalar_subquery())
+    return [
+        (item, highlight_snippet(snippet), rank)
+        for item, snippet, rank in await session.execute(stmt)
+    ]
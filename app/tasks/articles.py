@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from app.config import ENRICH_CONCURRENCY, ENRICH_HOST_RATE, ENRICH_PAGE_TIMEOUT
+from app.db.writer import db_writer
+from app.models.news import NewsItem, compute_article_hash
+from app.services.news_service import store_article_details
+from app.tasks.browser import BrowserManager, browser_manager
+
+logger = logging.getLogger("hltv_app")
+
+# Reads the article body, author and publish time in one evaluate() call;
+# falls back to the generic meta tags when the HLTV markup is missing.
+EXTRACT_ARTICLE_JS = """
+() => {
+    const text = (el) => (el ? el.innerText.trim() : null);
+    const meta = (selector) => {
+        const el = document.querySelector(selector);
+        return el ? el.getAttribute("content") : null;
+    };
+    let blocks = Array.from(document.querySelectorAll(".newstext-con p.news-block"));
+    if (!blocks.length) {
+        blocks = Array.from(document.querySelectorAll("article p"));
+    }
+    const date = document.querySelector(".article-info .date[data-unix]");
+    return {
+        body: blocks.map((p) => p.innerText.trim()).filter(Boolean).join("\\n\\n"),
+        author: text(document.querySelector(".article-info .authorName")) || meta('meta[name="author"]'),
+        published_unix: date ? date.getAttribute("data-unix") : null,
+        published_iso: meta('meta[property="article:published_time"]'),
+    };
+}
+"""
+
+
+def _parse_published(raw: dict[str, Any]) -> Optional[datetime]:
+    unix = raw.get("published_unix")
+    if unix and str(unix).isdigit():
+        # HLTV stores milliseconds since the epoch.
+        return datetime.fromtimestamp(int(unix) / 1000, tz=timezone.utc)
+    iso = raw.get("published_iso")
+    if iso:
+        try:
+            return datetime.fromisoformat(iso.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+
+def normalize_article(raw: dict[str, Any]) -> dict[str, Any]:
+    author = (raw.get("author") or "").strip()
+    return {
+        "body": raw.get("body") or None,
+        "author": author[:120] or None,
+        "published_at": _parse_published(raw),
+    }
+
+
+class HostRateLimiter:
+    """Spaces requests to the same host at least ``1 / rate`` seconds apart.
+
+    Every caller reserves the next free slot for its host and sleeps until
+    it, so concurrent tabs queue up instead of bursting.
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next: dict[str, float] = {}
+
+    async def wait(self, url: str) -> None:
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        now = time.monotonic()
+        slot = max(now, self._next.get(host, now))
+        self._next[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class ArticleEnricher:
+    """Opens article pages on up to ``concurrency`` tabs of one shared context.
+
+    Each page load is rate limited per host and bounded by ``page_timeout``;
+    a failed or timed out article is skipped and retried on the next run.
+    """
+
+    def __init__(
+        self, browser: BrowserManager, concurrency: int, host_rate: float, page_timeout: float
+    ) -> None:
+        self.browser = browser
+        self.concurrency = max(1, concurrency)
+        self.limiter = HostRateLimiter(host_rate)
+        self.page_timeout = page_timeout
+        self.fetched = 0
+        self.failed = 0
+        self.cached = 0
+        self.last_run_seconds: Optional[float] = None
+
+    async def _fetch(self, page: Any, url: str) -> dict[str, Any]:
+        response = await page.goto(
+            url, wait_until="domcontentloaded", timeout=self.page_timeout * 1000
+        )
+        if response is not None and response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}")
+        article = normalize_article(await page.evaluate(EXTRACT_ARTICLE_JS))
+        if not article["body"]:
+            raise RuntimeError("no article body found")
+        return article
+
+    async def fetch_articles(
+        self, targets: Sequence[Tuple[int, str]]
+    ) -> Dict[int, dict[str, Any]]:
+        """Fetch ``(item_id, url)`` targets; returns details for those that succeeded."""
+        if not targets or not self.browser.available:
+            return {}
+        queue: Deque[Tuple[int, str]] = deque(targets)
+        results: Dict[int, dict[str, Any]] = {}
+        started = time.perf_counter()
+
+        async def worker(context: Any) -> None:
+            page = await context.new_page()
+            try:
+                while queue:
+                    item_id, url = queue.popleft()
+                    await self.limiter.wait(url)
+                    try:
+                        results[item_id] = await asyncio.wait_for(
+                            self._fetch(page, url), self.page_timeout
+                        )
+                        self.fetched += 1
+                    except Exception as exc:
+                        self.failed += 1
+                        logger.warning("Article fetch failed for %s: %r", url, exc)
+                        if page.is_closed():
+                            page = await context.new_page()
+            finally:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+        async with self.browser.context() as context:
+            tabs = min(self.concurrency, len(targets))
+            await asyncio.gather(*(worker(context) for _ in range(tabs)))
+        self.last_run_seconds = time.perf_counter() - started
+        logger.info(
+            "Enriched %s/%s articles in %.2fs", len(results), len(targets), self.last_run_seconds
+        )
+        return results
+
+    async def enrich(self, items: Sequence[NewsItem]) -> List[NewsItem]:
+        """Fetch and store article details for items whose url/title changed
+        since they were last enriched; returns the items that were updated."""
+        due: Dict[int, Tuple[str, str]] = {}
+        for item in items:
+            key = compute_article_hash(item.url, item.title)
+            if item.article_hash == key:
+                self.cached += 1
+            else:
+                due[item.id] = (item.url, key)
+        found = await self.fetch_articles([(item_id, url) for item_id, (url, _) in due.items()])
+        if not found:
+            return []
+        details = {
+            item_id: {**article, "article_hash": due[item_id][1]}
+            for item_id, article in found.items()
+        }
+        return await db_writer.run(lambda session: store_article_details(session, details))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "cached": self.cached,
+            "concurrency": self.concurrency,
+            "last_run_seconds": self.last_run_seconds,
+        }
+
+
+article_enricher = ArticleEnricher(
+    browser_manager, ENRICH_CONCURRENCY, ENRICH_HOST_RATE, ENRICH_PAGE_TIMEOUT
+)
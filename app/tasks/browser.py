@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, List, Optional
+
+from app.config import BROWSER_POOL_SIZE, FETCH_BLOCKED_RESOURCES
+from app.services.metrics import FETCH_PHASE_SECONDS
+
+logger = logging.getLogger("hltv_app")
+
+try:
+    from playwright.async_api import async_playwright
+except ImportError:
+    async_playwright = None
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+)
+LAUNCH_ARGS = ["--no-sandbox", "--disable-setuid-sandbox"]
+
+
+class _Slot:
+    def __init__(self, context: Any, page: Any, generation: int) -> None:
+        self.context = context
+        self.page = page
+        self.generation = generation
+
+
+class BrowserManager:
+    """Long-lived Chromium with a bounded pool of reusable context/page slots.
+
+    The browser is launched once (on startup or on first use) and relaunched
+    transparently if it crashes; pages are handed out with :meth:`page`.
+    """
+
+    def __init__(self, pool_size: int, blocked_resources: frozenset[str] = frozenset()) -> None:
+        self.pool_size = max(1, pool_size)
+        self.blocked_resources = blocked_resources
+        self._playwright: Any = None
+        self._browser: Any = None
+        self._generation = 0
+        self._idle: List[_Slot] = []
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._lock = asyncio.Lock()
+        self.launch_seconds: Optional[float] = None
+        self.launches = 0
+        self.fetch_seconds: Deque[float] = deque(maxlen=100)
+
+    @property
+    def available(self) -> bool:
+        return async_playwright is not None
+
+    def _browser_alive(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self) -> None:
+        if not self.available:
+            logger.warning("playwright not installed; browser pool disabled")
+            return
+        async with self._lock:
+            try:
+                await self._ensure_browser()
+            except Exception as exc:
+                logger.warning("Chromium launch failed, will retry on next fetch: %s", exc)
+
+    async def _ensure_browser(self) -> None:
+        if self._browser_alive():
+            return
+        if self._browser is not None:
+            logger.warning("Chromium is not connected, relaunching")
+            await self._close_browser()
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        started = time.perf_counter()
+        self._browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        self.launch_seconds = time.perf_counter() - started
+        FETCH_PHASE_SECONDS.observe(self.launch_seconds, "playwright", "launch")
+        self.launches += 1
+        self._generation += 1
+        logger.info("Chromium launched in %.2fs (launch #%s)", self.launch_seconds, self.launches)
+
+    async def _close_browser(self) -> None:
+        self._idle.clear()
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception as exc:
+                logger.warning("Chromium close failed: %s", exc)
+
+    async def stop(self) -> None:
+        async with self._lock:
+            await self._close_browser()
+            if self._playwright is not None:
+                try:
+                    await self._playwright.stop()
+                except Exception as exc:
+                    logger.warning("Playwright stop failed: %s", exc)
+                self._playwright = None
+        logger.info("Browser pool stopped")
+
+    def _healthy(self, slot: _Slot) -> bool:
+        return (
+            slot.generation == self._generation
+            and self._browser_alive()
+            and not slot.page.is_closed()
+        )
+
+    async def _acquire(self) -> _Slot:
+        async with self._lock:
+            await self._ensure_browser()
+            while self._idle:
+                slot = self._idle.pop()
+                if self._healthy(slot):
+                    return slot
+                await self._discard(slot)
+            context = await self._new_context()
+            return _Slot(context, await context.new_page(), self._generation)
+
+    async def _new_context(self) -> Any:
+        context = await self._browser.new_context(
+            user_agent=USER_AGENT,
+            viewport={"width": 1920, "height": 1080},
+        )
+        if self.blocked_resources:
+            await context.route("**/*", self._block_resources)
+        return context
+
+    async def _block_resources(self, route: Any) -> None:
+        if route.request.resource_type in self.blocked_resources:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _discard(self, slot: _Slot) -> None:
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Any]:
+        """Borrow a pooled page; waits while all ``pool_size`` slots are busy."""
+        async with self._slots:
+            slot = await self._acquire()
+            started = time.perf_counter()
+            try:
+                yield slot.page
+            except BaseException:
+                await self._discard(slot)
+                raise
+            else:
+                if self._healthy(slot):
+                    self._idle.append(slot)
+                else:
+                    await self._discard(slot)
+            finally:
+                self.fetch_seconds.append(time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator[Any]:
+        """Borrow one pool slot as a fresh context to open several tabs in.
+
+        Tabs of one context share its cookies and cache; the context is
+        closed when the block exits.
+        """
+        async with self._slots:
+            async with self._lock:
+                await self._ensure_browser()
+                context = await self._new_context()
+            try:
+                yield context
+            finally:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict[str, Any]:
+        fetches = list(self.fetch_seconds)
+        return {
+            "browser_connected": self._browser_alive(),
+            "launches": self.launches,
+            "launch_seconds": self.launch_seconds,
+            "pool_size": self.pool_size,
+            "idle_pages": len(self._idle),
+            "last_fetch_seconds": fetches[-1] if fetches else None,
+            "avg_fetch_seconds": sum(fetches) / len(fetches) if fetches else None,
+        }
+
+
+browser_manager = BrowserManager(BROWSER_POOL_SIZE, FETCH_BLOCKED_RESOURCES)
@@ -0,0 +1,315 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.config import FETCH_ENGINES, FETCH_HTTP_MAX_CONNECTIONS, FETCH_HTTP_TIMEOUT, FETCH_URL
+from app.services.metrics import FETCH_FAILURES, FETCH_PHASE_SECONDS, FETCH_SECONDS
+from app.tasks.browser import USER_AGENT, BrowserManager, browser_manager
+
+logger = logging.getLogger("hltv_app")
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+HLTV_URL = "https://www.hltv.org"
+NEWSLINE_SELECTOR = "a.newsline.article"
+
+# Collects every newsline row inside the page in one evaluate() round trip
+# instead of ~8 awaited element-handle calls per anchor.
+EXTRACT_NEWS_JS = """
+([selector, limit]) => {
+    const text = (el) => (el ? el.innerText : null);
+    return Array.from(document.querySelectorAll(selector)).slice(0, limit).map((a) => {
+        const flag = a.querySelector(".newsflag");
+        return {
+            href: a.getAttribute("href") || "",
+            title: text(a.querySelector(".newstext")),
+            country: flag ? flag.getAttribute("title") : null,
+            published_text: text(a.querySelector(".newsrecent")),
+            comments: text(a.querySelector(".newstc div:last-child")),
+        };
+    });
+}
+"""
+
+# Responses that mean the site refused a plain HTTP client (rate limit or a
+# bot challenge) rather than being down.
+BLOCKED_STATUSES = frozenset({403, 429, 503})
+CHALLENGE_MARKERS = ("challenge-platform", "cf-chl-", "<title>Just a moment...</title>")
+
+
+class FetchBlocked(Exception):
+    """The site answered with a block or bot challenge instead of the page."""
+
+
+def _parse_comments(raw: Optional[str]) -> Optional[int]:
+    if not raw:
+        return None
+    digits = "".join(ch for ch in raw if ch.isdigit())
+    return int(digits) if digits else None
+
+
+def _normalize_row(row: dict[str, Any], base_url: str = HLTV_URL) -> dict[str, Any]:
+    title = row.get("title")
+    return {
+        "title": title.strip() if title is not None else "No title",
+        "url": f"{base_url}{row.get('href') or ''}".strip(),
+        "country": row.get("country"),
+        "published_text": row.get("published_text"),
+        "comments": _parse_comments(row.get("comments")),
+    }
+
+
+async def extract_news(page: Any, limit: int, base_url: str = HLTV_URL) -> List[dict[str, Any]]:
+    rows = await page.evaluate(EXTRACT_NEWS_JS, [NEWSLINE_SELECTOR, limit])
+    logger.info("Extracted %s newsline rows", len(rows))
+    return [_normalize_row(row, base_url) for row in rows]
+
+
+def _inner_text(node: Any) -> Optional[str]:
+    # The newsline cells hold inline text only, for which innerText is the
+    # text content with whitespace runs collapsed and the ends trimmed.
+    if node is None:
+        return None
+    return " ".join(node.text(deep=True).split())
+
+
+def parse_news_html(html: str, limit: int, base_url: str = HLTV_URL) -> List[dict[str, Any]]:
+    """Server-side twin of :data:`EXTRACT_NEWS_JS`: same selectors, same row shape."""
+    tree = LexborHTMLParser(html)
+    rows = []
+    for anchor in tree.css(NEWSLINE_SELECTOR)[:limit]:
+        flag = anchor.css_first(".newsflag")
+        rows.append(
+            {
+                "href": anchor.attributes.get("href") or "",
+                "title": _inner_text(anchor.css_first(".newstext")),
+                "country": flag.attributes.get("title") if flag is not None else None,
+                "published_text": _inner_text(anchor.css_first(".newsrecent")),
+                "comments": _inner_text(anchor.css_first(".newstc div:last-child")),
+            }
+        )
+    return [_normalize_row(row, base_url) for row in rows]
+
+
+class FetchEngine:
+    """Loads the front page and returns normalized newsline rows."""
+
+    name = "base"
+
+    def __init__(self, url: str = FETCH_URL, base_url: str = HLTV_URL) -> None:
+        self.url = url
+        self.base_url = base_url
+        self.runs = 0
+        self.failures = 0
+        self.last_seconds: Optional[float] = None
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    async def fetch(self, limit: int) -> List[dict[str, Any]]:
+        started = time.perf_counter()
+        self.runs += 1
+        try:
+            return await self._fetch(limit)
+        except Exception:
+            self.failures += 1
+            FETCH_FAILURES.inc(self.name)
+            raise
+        finally:
+            self.last_seconds = time.perf_counter() - started
+            FETCH_SECONDS.observe(self.last_seconds, self.name)
+
+    async def _fetch(self, limit: int) -> List[dict[str, Any]]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "available": self.available,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_seconds": self.last_seconds,
+        }
+
+
+class HttpFetchEngine(FetchEngine):
+    """Plain GET through a pooled keep-alive ``httpx`` client, parsed with selectolax."""
+
+    name = "http"
+
+    def __init__(
+        self,
+        url: str = FETCH_URL,
+        base_url: str = HLTV_URL,
+        timeout: float = FETCH_HTTP_TIMEOUT,
+        max_connections: int = FETCH_HTTP_MAX_CONNECTIONS,
+    ) -> None:
+        super().__init__(url, base_url)
+        self.timeout = timeout
+        self.max_connections = max(1, max_connections)
+        self._client: Any = None
+
+    @property
+    def available(self) -> bool:
+        return httpx is not None and LexborHTMLParser is not None
+
+    def _get_client(self) -> Any:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "User-Agent": USER_AGENT,
+                    "Accept": "text/html,application/xhtml+xml",
+                    "Accept-Language": "en-US,en;q=0.9",
+                },
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def _fetch(self, limit: int) -> List[dict[str, Any]]:
+        with FETCH_PHASE_SECONDS.time(self.name, "navigation"):
+            response = await self._get_client().get(self.url)
+        logger.info("HLTV http fetch status=%s url=%s", response.status_code, response.url)
+        html = response.text
+        if response.status_code in BLOCKED_STATUSES or any(
+            marker in html for marker in CHALLENGE_MARKERS
+        ):
+            raise FetchBlocked(f"HTTP {response.status_code} from {response.url}")
+        response.raise_for_status()
+        with FETCH_PHASE_SECONDS.time(self.name, "extraction"):
+            items = parse_news_html(html, limit, self.base_url)
+        logger.info("Extracted %s newsline rows", len(items))
+        return items
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+
+class PlaywrightFetchEngine(FetchEngine):
+    """Renders the page in the pooled headless Chromium."""
+
+    name = "playwright"
+
+    def __init__(
+        self,
+        url: str = FETCH_URL,
+        base_url: str = HLTV_URL,
+        browser: BrowserManager = browser_manager,
+    ) -> None:
+        super().__init__(url, base_url)
+        self.browser = browser
+
+    @property
+    def available(self) -> bool:
+        return self.browser.available
+
+    async def _fetch(self, limit: int) -> List[dict[str, Any]]:
+        async with self.browser.page() as page:
+            with FETCH_PHASE_SECONDS.time(self.name, "navigation"):
+                response = await page.goto(
+                    self.url, wait_until="domcontentloaded", timeout=60000
+                )
+                status = response.status if response else None
+                logger.info(
+                    "HLTV fetch status=%s url=%s", status, response.url if response else None
+                )
+                try:
+                    await page.wait_for_selector(NEWSLINE_SELECTOR, timeout=5000)
+                except Exception:
+                    logger.warning("Selector a.newsline.article not found within timeout")
+            with FETCH_PHASE_SECONDS.time(self.name, "extraction"):
+                items = await extract_news(page, limit, self.base_url)
+        logger.info("HLTV fetch took %.2fs", self.browser.fetch_seconds[-1])
+        return items
+
+
+ENGINE_TYPES: Dict[str, type[FetchEngine]] = {
+    HttpFetchEngine.name: HttpFetchEngine,
+    PlaywrightFetchEngine.name: PlaywrightFetchEngine,
+}
+
+
+class EngineChain:
+    """Tries the engines in order and returns the first non-empty result.
+
+    An engine that is unavailable (its package is missing) is skipped; one
+    that raises (blocked, network error) or finds no rows hands over to the
+    next one.
+    """
+
+    def __init__(self, engines: Sequence[FetchEngine]) -> None:
+        self.engines = list(engines)
+        self.fallbacks = 0
+        self.last_engine: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return any(engine.available for engine in self.engines)
+
+    async def fetch(self, limit: int) -> List[dict[str, Any]]:
+        error: Optional[Exception] = None
+        answered = False
+        tried = 0
+        for engine in self.engines:
+            if not engine.available:
+                continue
+            if tried:
+                self.fallbacks += 1
+                logger.info("Falling back to the %s fetch engine", engine.name)
+            tried += 1
+            try:
+                items = await engine.fetch(limit)
+            except Exception as exc:
+                logger.warning("%s fetch engine failed: %s", engine.name, exc)
+                error = exc
+                continue
+            answered = True
+            self.last_engine = engine.name
+            if items:
+                return items
+            logger.warning("%s fetch engine found no newsline rows", engine.name)
+        if error is not None and not answered:
+            raise error
+        return []
+
+    async def close(self) -> None:
+        for engine in self.engines:
+            await engine.close()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "order": [engine.name for engine in self.engines],
+            "last_engine": self.last_engine,
+            "fallbacks": self.fallbacks,
+            "engines": {engine.name: engine.stats() for engine in self.engines},
+        }
+
+
+def _build_engines(names: Sequence[str]) -> List[FetchEngine]:
+    engines = []
+    for name in names:
+        if name not in ENGINE_TYPES:
+            logger.warning("Unknown fetch engine %r ignored", name)
+            continue
+        engines.append(ENGINE_TYPES[name]())
+    return engines
+
+
+fetch_engine = EngineChain(_build_engines(FETCH_ENGINES))
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+
+from app.config import (
+    FETCH_HISTORY_SIZE,
+    FETCH_INTERVAL,
+    FETCH_MAX_BACKOFF,
+    FETCH_MAX_INTERVAL,
+    FETCH_MIN_INTERVAL,
+    FETCH_RETRY_BASE,
+    INSTANCE_ID,
+)
+from app.nats.client import nats_client
+from app.nats.lease import leader_lease
+from app.tasks.fetcher import run_background_fetch
+
+logger = logging.getLogger("hltv_app")
+
+FetchJob = Callable[[], Awaitable[dict[str, Any]]]
+
+
+class FetchScheduler:
+    """Runs the fetch job on an adaptive schedule, one run at a time.
+
+    :meth:`run_now` is single-flight: while a run is in progress every
+    caller awaits that same run instead of starting another. After a
+    successful run the interval halves if new items appeared and grows by a
+    quarter otherwise, within ``[min_interval, max_interval]``; after a
+    failure the next attempt is delayed by an exponential backoff with
+    jitter. The loop sleeps on an event, so :meth:`wake` and :meth:`stop`
+    take effect immediately.
+    """
+
+    def __init__(
+        self,
+        job: FetchJob,
+        interval: float,
+        min_interval: float,
+        max_interval: float,
+        retry_base: float,
+        max_backoff: float,
+        history_size: int,
+    ) -> None:
+        self.job = job
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self.retry_base = retry_base
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.next_run_at: Optional[datetime] = None
+        self.history: Deque[dict[str, Any]] = deque(maxlen=max(1, history_size))
+        self._current: Optional[asyncio.Task] = None
+        self._joined = 0
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._loop_task: Optional[asyncio.Task] = None
+        # Scheduled runs only happen while this returns True (see leader lease).
+        self.gate: Callable[[], bool] = lambda: True
+
+    @property
+    def running(self) -> bool:
+        return self._current is not None and not self._current.done()
+
+    async def start(self) -> None:
+        if self._loop_task is not None:
+            return
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self.next_run_at = datetime.now(timezone.utc)
+        self._loop_task = asyncio.create_task(self._loop())
+        logger.info("Fetch scheduler started, base interval %ss", self.interval)
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        if self._current is not None:
+            self._current.cancel()
+        for task in (self._loop_task, self._current):
+            if task is None:
+                continue
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._loop_task = self._current = None
+        self.next_run_at = None
+
+    def wake(self) -> None:
+        """Make the loop re-check the gate and the next run time."""
+        self._wake.set()
+
+    async def run_now(self, reason: str = "manual") -> Tuple[dict[str, Any], bool]:
+        """Run the job, or join the run already in flight.
+
+        Returns the run's record and whether this caller joined a run that
+        someone else started.
+        """
+        joined = self.running
+        if joined:
+            self._joined += 1
+        else:
+            self._joined = 0
+            self._current = asyncio.create_task(self._run(reason))
+        return await asyncio.shield(self._current), joined
+
+    async def _loop(self) -> None:
+        while True:
+            self._wake.clear()
+            if self._stopping:
+                return
+            if not self.gate():
+                await self._wake.wait()
+                continue
+            delay = 0.0
+            if self.next_run_at is not None:
+                delay = (self.next_run_at - datetime.now(timezone.utc)).total_seconds()
+            if delay > 0:
+                # Woken or due: either way re-check the gate and the time first.
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_now("schedule")
+
+    async def _run(self, reason: str) -> dict[str, Any]:
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        record: dict[str, Any] = {"started_at": started_at.isoformat(), "reason": reason}
+        try:
+            result = await self.job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Background fetch failed: %s", exc)
+            self.failures += 1
+            backoff = min(self.max_backoff, self.retry_base * 2 ** (self.failures - 1))
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            record.update(status="error", error=str(exc) or type(exc).__name__, result=None)
+        else:
+            self.failures = 0
+            if result.get("created"):
+                self.interval = max(self.min_interval, self.interval / 2)
+            else:
+                self.interval = min(self.max_interval, self.interval * 1.25)
+            delay = self.interval
+            record.update(status="ok", error=None, result=result)
+        self.next_run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        record.update(
+            duration_seconds=round(time.perf_counter() - started, 3),
+            joined=self._joined,
+            next_run_at=self.next_run_at.isoformat(),
+        )
+        self.history.append(record)
+        logger.info("Fetch run %s (%s), next run in %.0fs", record["status"], reason, delay)
+        # Let the loop pick up the new next_run_at (e.g. after a manual run).
+        self._wake.set()
+        return record
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "active": self.gate(),
+            "interval_seconds": self.interval,
+            "consecutive_failures": self.failures,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "recent_runs": list(reversed(self.history)),
+        }
+
+
+async def _scheduled_fetch() -> dict[str, Any]:
+    return await run_background_fetch(datetime.now(timezone.utc))
+
+
+fetch_scheduler = FetchScheduler(
+    _scheduled_fetch,
+    FETCH_INTERVAL,
+    FETCH_MIN_INTERVAL,
+    FETCH_MAX_INTERVAL,
+    FETCH_RETRY_BASE,
+    FETCH_MAX_BACKOFF,
+    FETCH_HISTORY_SIZE,
+)
+
+
+# Each instance answers forwarded runs on TASKS_RUN_SUBJECT.<instance id>.
+TASKS_RUN_SUBJECT = "tasks.run"
+
+
+async def run_fetch_on_leader(timeout: float) -> Tuple[dict[str, Any], bool]:
+    """Run (or join) a fetch here if this instance is the leader, otherwise
+    ask the leader over NATS; returns the run record and whether the caller
+    joined a run already in progress.
+
+    Fails fast when no instance holds the lease, and (through NATS "no
+    responders") when the holder is not connected, instead of waiting out
+    ``timeout``.
+    """
+    if leader_lease.is_leader:
+        return await fetch_scheduler.run_now()
+    holder = await leader_lease.current_holder()
+    if holder is None:
+        raise RuntimeError("no instance holds the leader lease")
+    reply = await nats_client.request(
+        f"{TASKS_RUN_SUBJECT}.{holder}", {"origin": INSTANCE_ID}, timeout
+    )
+    if reply is None:
+        return await fetch_scheduler.run_now()
+    if reply.get("error"):
+        raise RuntimeError(reply["error"])
+    return reply["record"], reply["joined"]
+
+
+async def _serve_run_request(request: dict[str, Any]) -> dict[str, Any]:
+    if not leader_lease.is_leader:
+        return {"error": "instance is no longer the leader"}
+    record, joined = await fetch_scheduler.run_now(f"request from {request.get('origin')}")
+    return {"record": record, "joined": joined}
+
+
+async def start_leader_scheduling() -> None:
+    """Tie the fetch scheduler to the leader lease and accept forwarded runs."""
+    fetch_scheduler.gate = lambda: leader_lease.is_leader
+    leader_lease.add_listener(lambda leader: fetch_scheduler.wake())
+    await nats_client.serve(f"{TASKS_RUN_SUBJECT}.{INSTANCE_ID}", _serve_run_request)
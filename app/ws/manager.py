@@ -1,38 +1,483 @@
-import json
+import asyncio
 import logging
-from typing import Any, List, Set
+import time
+from collections import deque
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from fastapi import WebSocket
 
+from app.config import WS_OVERFLOW_POLICY, WS_QUEUE_SIZE, WS_SEND_TIMEOUT
+from app.services.codec import Codec, EncodedEvent, json_codec
+from app.services.metrics import WS_BROADCAST_SECONDS
+
 logger = logging.getLogger("hltv_app")
 
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+SUBSCRIPTION_ACTIONS = ("subscribe", "unsubscribe", "reset")
+FORWARDED_EVENT = "nats.forwarded"
+BATCH_EVENT = "batch"
+
+Frame = Union[str, bytes]
+# (event, item id, country) a message is routed by
+Route = Tuple[Optional[str], Optional[Hashable], Optional[str]]
+
+
+def _coalesce_key(message: dict[str, Any]) -> Optional[Hashable]:
+    data = message.get("data")
+    if isinstance(data, dict) and "id" in data:
+        return (message.get("event"), data["id"])
+    return None
+
+
+def _coalesced(
+    codec: Codec,
+    key: Hashable,
+    queued: Optional[dict[str, Any]],
+    message: Optional[dict[str, Any]],
+    data: Frame,
+) -> Tuple[Hashable, Optional[dict[str, Any]], Frame]:
+    """Queue entry replacing ``queued`` with ``message`` for the same key.
+
+    ``item.updated`` payloads carry only the changed fields, so they are
+    merged (as ``EventBatcher`` does) and re-encoded; anything else is a
+    full payload and the newer one wins.
+    """
+    if (
+        queued is not None
+        and message is not None
+        and message.get("event") == "item.updated"
+        and isinstance(queued.get("data"), dict)
+        and isinstance(message.get("data"), dict)
+    ):
+        merged = {**message, "data": {**queued["data"], **message["data"]}}
+        return key, merged, EncodedEvent(merged).frame(codec)
+    return key, message, data
+
+
+def _route(message: dict[str, Any], country: Optional[str] = None) -> Route:
+    """Routing attributes of ``message``; ``country`` is used when the payload
+    has none (partial updates and deletes carry only the id)."""
+    data = message.get("data")
+    if message.get("event") == FORWARDED_EVENT and isinstance(data, dict):
+        # A forwarded event is routed by the item of the event it wraps.
+        data = data.get("data")
+    if not isinstance(data, dict):
+        return message.get("event"), None, None
+    return message.get("event"), data.get("id"), data.get("country", country)
+
+
+class Subscription:
+    """Per-connection filter: event types, countries and item ids.
+
+    A message matches when every non-empty set contains its value (any of
+    the listed values within a set); with all sets empty everything matches.
+    """
+
+    FIELDS = ("events", "countries", "ids")
 
-class WebSocketManager:
     def __init__(self) -> None:
-        self.active: Set[WebSocket] = set()
+        self.events: Set[str] = set()
+        self.countries: Set[str] = set()
+        self.ids: Set[int] = set()
 
-    async def connect(self, websocket: WebSocket) -> None:
-        await websocket.accept()
-        self.active.add(websocket)
+    @property
+    def filtered(self) -> bool:
+        return bool(self.events or self.countries or self.ids)
+
+    # Most selective first: a connection is indexed under one field only.
+    INDEX_ORDER = ("ids", "countries", "events")
+
+    def keys(self) -> List[Tuple[str, Hashable]]:
+        """Index keys: the values of the most selective non-empty field.
+
+        Every matching message carries one of them, so a broadcast visits only
+        connections indexed under its own id, country or event.
+        """
+        for field in self.INDEX_ORDER:
+            values = getattr(self, field)
+            if values:
+                return [(field, value) for value in values]
+        return []
+
+    def matches(self, route: Route) -> bool:
+        event, item_id, country = route
+        return (
+            (not self.events or event in self.events)
+            and (not self.countries or country in self.countries)
+            and (not self.ids or item_id in self.ids)
+        )
+
+    def as_dict(self) -> dict[str, List[Any]]:
+        return {field: sorted(getattr(self, field)) for field in self.FIELDS}
+
+
+def parse_subscription(message: Any) -> Tuple[str, Dict[str, Set[Any]]]:
+    """Validate a client ``{"action": ..., "events": [...], ...}`` message."""
+    if not isinstance(message, dict) or message.get("action") not in SUBSCRIPTION_ACTIONS:
+        raise ValueError(f"expected an object with action one of {', '.join(SUBSCRIPTION_ACTIONS)}")
+    values: Dict[str, Set[Any]] = {}
+    for field in Subscription.FIELDS:
+        raw = message.get(field) or []
+        if not isinstance(raw, list):
+            raise ValueError(f"'{field}' must be a list")
+        if field == "ids":
+            valid = all(isinstance(v, int) and not isinstance(v, bool) for v in raw)
+        else:
+            valid = all(isinstance(v, str) for v in raw)
+        if not valid:
+            kind = "integers" if field == "ids" else "strings"
+            raise ValueError(f"'{field}' must contain {kind}")
+        values[field] = set(raw)
+    return message["action"], values
+
+
+class _Connection:
+    def __init__(
+        self, websocket: WebSocket, max_queue: int, batched: bool, codec: Codec
+    ) -> None:
+        self.websocket = websocket
+        self.batched = batched
+        self.codec = codec
+        self.subscription = Subscription()
+        # (coalesce key, message, frame); the message is kept for merging
+        self.queue: Deque[Tuple[Optional[Hashable], Optional[dict[str, Any]], Frame]] = deque()
+        self.max_queue = max_queue
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.last_send_seconds: Optional[float] = None
+
+    def stats(self) -> dict[str, Any]:
+        client = self.websocket.client
+        return {
+            "client": f"{client.host}:{client.port}" if client else None,
+            "batched": self.batched,
+            "codec": self.codec.name,
+            "subscription": self.subscription.as_dict(),
+            "connected_at": self.connected_at,
+            "queued": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "last_send_seconds": self.last_send_seconds,
+        }
+
+
+class WebSocketManager:
+    """Fans messages out through a bounded queue and writer task per socket.
+
+    ``broadcast`` serializes once per codec in use and enqueues, so a slow
+    client can never hold up other clients or the caller. When a queue is
+    full the overflow policy decides: ``drop_oldest`` discards the oldest
+    frame, ``coalesce`` replaces a queued frame for the same event/item id
+    (falling back to dropping the oldest) and ``disconnect`` closes the slow
+    consumer.
+
+    Clients that subscribed to filters are kept in an index from filter key
+    (event type, country, item id) to connections, so a broadcast only
+    visits the unfiltered connections and those subscribed to one of the
+    message's keys.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = WS_QUEUE_SIZE,
+        overflow_policy: str = WS_OVERFLOW_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT,
+    ) -> None:
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy: {overflow_policy}")
+        self.max_queue = max(1, max_queue)
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.active: Dict[WebSocket, _Connection] = {}
+        self.slow_disconnects = 0
+        self._closing: Set[asyncio.Task] = set()
+        self._unfiltered: Set[_Connection] = set()
+        self._index: Dict[Tuple[str, Hashable], Set[_Connection]] = {}
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        batched: bool = False,
+        codec: Codec = json_codec,
+        subprotocol: Optional[str] = None,
+    ) -> None:
+        await websocket.accept(subprotocol=subprotocol)
+        conn = _Connection(websocket, self.max_queue, batched, codec)
+        conn.task = asyncio.create_task(self._writer(conn))
+        self.active[websocket] = conn
+        self._unfiltered.add(conn)
         logger.info("WebSocket connected (%s active)", len(self.active))
 
     def disconnect(self, websocket: WebSocket) -> None:
-        self.active.discard(websocket)
+        conn = self.active.pop(websocket, None)
+        if conn is None:
+            return
+        self._unindex(conn)
+        self._unfiltered.discard(conn)
+        if conn.task is not None and conn.task is not asyncio.current_task():
+            conn.task.cancel()
         logger.info("WebSocket disconnected (%s active)", len(self.active))
 
-    async def broadcast(self, message: dict[str, Any]) -> None:
-        if not self.active:
+    def _unindex(self, conn: _Connection) -> None:
+        for key in conn.subscription.keys():
+            subscribers = self._index.get(key)
+            if subscribers is not None:
+                subscribers.discard(conn)
+                if not subscribers:
+                    del self._index[key]
+
+    def subscribe(self, websocket: WebSocket, action: str, values: Dict[str, Set[Any]]) -> None:
+        """Apply a subscribe/unsubscribe/reset and re-index the connection."""
+        conn = self.active.get(websocket)
+        if conn is None:
             return
-        data = json.dumps(message)
-        stale: List[WebSocket] = []
-        for ws in self.active:
+        self._unindex(conn)
+        subscription = conn.subscription
+        for field in Subscription.FIELDS:
+            current: Set[Any] = getattr(subscription, field)
+            if action == "reset":
+                current.clear()
+            elif action == "subscribe":
+                current |= values[field]
+            else:
+                current -= values[field]
+        for key in subscription.keys():
+            self._index.setdefault(key, set()).add(conn)
+        if subscription.filtered:
+            self._unfiltered.discard(conn)
+        else:
+            self._unfiltered.add(conn)
+        self.send(websocket, {"event": "subscription", "data": subscription.as_dict()})
+
+    def handle_client_message(self, websocket: WebSocket, raw: Union[str, bytes, None]) -> None:
+        """Decode a client frame (JSON text, or binary in the connection's codec)
+        and apply it as a subscription change; invalid ones get an ``error`` event."""
+        conn = self.active.get(websocket)
+        if conn is None or raw is None:
+            return
+        try:
+            message = json_codec.decode(raw) if isinstance(raw, str) else conn.codec.decode(raw)
+            action, values = parse_subscription(message)
+        except Exception as exc:
+            self.send(websocket, {"event": "error", "data": {"detail": str(exc)}})
+            return
+        self.subscribe(websocket, action, values)
+
+    def send(self, websocket: WebSocket, message: dict[str, Any]) -> None:
+        """Queue a message for one client only."""
+        conn = self.active.get(websocket)
+        if conn is not None and not self._enqueue(
+            conn, None, EncodedEvent(message).frame(conn.codec)
+        ):
+            self._drop_slow([conn])
+
+    def _targets(self, route: Route) -> Iterable[_Connection]:
+        if not self._index:
+            return self._unfiltered
+        event, item_id, country = route
+        targets = set(self._unfiltered)
+        for key in (("ids", item_id), ("countries", country), ("events", event)):
+            for conn in self._index.get(key, ()):
+                if conn.subscription.matches(route):
+                    targets.add(conn)
+        return targets
+
+    async def _writer(self, conn: _Connection) -> None:
+        while True:
+            if not conn.queue:
+                conn.ready.clear()
+                await conn.ready.wait()
+                continue
+            _, _, data = conn.queue.popleft()
+            started = time.perf_counter()
+            websocket = conn.websocket
+            send = websocket.send_bytes if isinstance(data, bytes) else websocket.send_text
             try:
-                await ws.send_text(data)
-            except Exception:
-                stale.append(ws)
-        for ws in stale:
-            self.disconnect(ws)
+                await asyncio.wait_for(send(data), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.info("WebSocket send failed, dropping client: %s", exc)
+                self.disconnect(conn.websocket)
+                return
+            conn.last_send_seconds = time.perf_counter() - started
+            conn.sent += 1
 
+    async def _close_slow(self, websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
 
-ws_manager = WebSocketManager()
+    def _enqueue(
+        self,
+        conn: _Connection,
+        key: Optional[Hashable],
+        data: Frame,
+        message: Optional[dict[str, Any]] = None,
+    ) -> bool:
+        if len(conn.queue) >= conn.max_queue:
+            if self.overflow_policy == "disconnect":
+                return False
+            if self.overflow_policy == "coalesce" and key is not None:
+                for index, (queued_key, queued, _) in enumerate(conn.queue):
+                    if queued_key == key:
+                        conn.queue[index] = _coalesced(conn.codec, key, queued, message, data)
+                        conn.coalesced += 1
+                        return True
+            conn.queue.popleft()
+            conn.dropped += 1
+        conn.queue.append((key, message, data))
+        conn.max_depth = max(conn.max_depth, len(conn.queue))
+        conn.ready.set()
+        return True
+
+    def _drop_slow(self, slow: Iterable[_Connection]) -> None:
+        for conn in slow:
+            self.slow_disconnects += 1
+            self.disconnect(conn.websocket)
+            task = asyncio.create_task(self._close_slow(conn.websocket))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def broadcast(
+        self, message: Union[dict[str, Any], EncodedEvent], country: Optional[str] = None
+    ) -> None:
+        """Send to every client whose subscription matches; ``country`` routes
+        payloads that do not carry one."""
+        if not self.active:
+            return
+        started = time.perf_counter()
+        event = message if isinstance(message, EncodedEvent) else EncodedEvent(message)
+        inner = event.message.get("data")
+        if (
+            event.message.get("event") == FORWARDED_EVENT
+            and isinstance(inner, dict)
+            and inner.get("event") == BATCH_EVENT
+            and isinstance(inner.get("data"), list)
+        ):
+            self._forward_batch(event)
+            WS_BROADCAST_SECONDS.observe(time.perf_counter() - started, "batch")
+            return
+        key = _coalesce_key(event.message)
+        self._drop_slow(
+            [
+                conn
+                for conn in self._targets(_route(event.message, country))
+                if not self._enqueue(conn, key, event.frame(conn.codec), event.message)
+            ]
+        )
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - started, "single")
+
+    def _forward_batch(self, event: EncodedEvent) -> None:
+        """Forward a remote ``batch``: each entry is routed on its own and a
+        filtered client gets the batch with just its matching entries."""
+        inner = event.message["data"]
+        entries: List[Any] = inner["data"]
+        slow: Set[_Connection] = set()
+        for conn in self._unfiltered:
+            if not self._enqueue(conn, None, event.frame(conn.codec)):
+                slow.add(conn)
+        picked: Dict[_Connection, List[int]] = {}
+        if self._index:
+            for index, entry in enumerate(entries):
+                if not isinstance(entry, dict):
+                    continue
+                route = _route({"event": FORWARDED_EVENT, "data": entry})
+                for conn in self._targets(route):
+                    if conn.subscription.filtered:
+                        picked.setdefault(conn, []).append(index)
+        subsets: Dict[Tuple[int, ...], EncodedEvent] = {}
+        for conn, indexes in picked.items():
+            selection = tuple(indexes)
+            subset = event if len(selection) == len(entries) else subsets.get(selection)
+            if subset is None:
+                subset = subsets[selection] = EncodedEvent(
+                    {
+                        **event.message,
+                        "data": {**inner, "data": [entries[i] for i in selection]},
+                    }
+                )
+            if not self._enqueue(conn, None, subset.frame(conn.codec)):
+                slow.add(conn)
+        self._drop_slow(slow)
 
+    async def broadcast_batch(
+        self, batch: EncodedEvent, countries: Optional[Sequence[Optional[str]]] = None
+    ) -> None:
+        """Send a ``batch`` message as one frame to clients that opted in and
+        its ``data`` entries as individual frames to everyone else.
+
+        Each entry goes only to matching clients; a batched client with a
+        filter gets a batch of just its matching entries (encoded once per
+        distinct selection). ``countries`` are routing hints per entry.
+        """
+        entries: List[dict[str, Any]] = batch.message["data"]
+        if not self.active or not entries:
+            return
+        started = time.perf_counter()
+        hints = countries if countries is not None else [None] * len(entries)
+        slow: Set[_Connection] = set()
+        for conn in self._unfiltered:
+            if conn.batched and not self._enqueue(conn, None, batch.frame(conn.codec)):
+                slow.add(conn)
+        picked: Dict[_Connection, List[int]] = {}
+        for index, (entry, hint) in enumerate(zip(entries, hints)):
+            event: Optional[EncodedEvent] = None
+            key = _coalesce_key(entry)
+            for conn in self._targets(_route(entry, hint)):
+                if conn in slow:
+                    continue
+                if conn.batched:
+                    if conn.subscription.filtered:
+                        picked.setdefault(conn, []).append(index)
+                    continue
+                if event is None:
+                    event = EncodedEvent(entry)
+                if not self._enqueue(conn, key, event.frame(conn.codec), entry):
+                    slow.add(conn)
+        subsets: Dict[Tuple[int, ...], EncodedEvent] = {}
+        for conn, indexes in picked.items():
+            selection = tuple(indexes)
+            subset = batch if len(selection) == len(entries) else subsets.get(selection)
+            if subset is None:
+                subset = subsets[selection] = EncodedEvent(
+                    {**batch.message, "data": [entries[i] for i in selection]}
+                )
+            if not self._enqueue(conn, None, subset.frame(conn.codec)):
+                slow.add(conn)
+        self._drop_slow(slow)
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - started, "batch")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active": len(self.active),
+            "filtered": len(self.active) - len(self._unfiltered),
+            "filter_keys": len(self._index),
+            "max_queue": self.max_queue,
+            "overflow_policy": self.overflow_policy,
+            "slow_disconnects": self.slow_disconnects,
+            "connections": [conn.stats() for conn in self.active.values()],
+        }
+
+
+ws_manager = WebSocketManager()
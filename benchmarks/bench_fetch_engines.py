@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Front-page fetch engines: latency and parse parity on recorded fixtures.
+
+Serves the HTML fixtures from a local stand-in server (keep-alive, with
+slow static assets) and runs the plain-HTTP engine and the Playwright
+engine against each one. Both must return identical rows. A page answering
+403 with a bot challenge checks that the engine chain falls back to
+Chromium. Without a launchable Chromium only the HTTP side is measured.
+
+    python benchmarks/bench_fetch_engines.py --runs 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.tasks.browser import BrowserManager  # noqa: E402
+from app.tasks.engines import (  # noqa: E402
+    HLTV_URL,
+    EngineChain,
+    FetchEngine,
+    HttpFetchEngine,
+    PlaywrightFetchEngine,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGES = {
+    "/": "hltv_frontpage.html",
+    "/edge": "hltv_frontpage_edge.html",
+}
+BLOCKED_PAGE = "/blocked"
+ASSET_DELAY_SECONDS = 0.05
+LIMIT = 100
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body in one segment; otherwise Nagle + delayed ACK add ~40ms
+    # to every keep-alive response.
+    disable_nagle_algorithm = True
+    wbufsize = 1 << 16
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, directory=FIXTURES, **kwargs)
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path in PAGES or self.path == BLOCKED_PAGE:
+            name = PAGES.get(self.path, "hltv_blocked.html")
+            with open(os.path.join(FIXTURES, name), "rb") as fh:
+                body = fh.read()
+            status = 403 if self.path == BLOCKED_PAGE else 200
+            return self._send(status, body, "text/html; charset=utf-8")
+        # Stand-in for images, fonts and stylesheets on a remote CDN.
+        time.sleep(ASSET_DELAY_SECONDS)
+        self._send(200, b"/* asset */", "text/css")
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+async def timed(engine: FetchEngine, runs: int) -> dict[str, Any]:
+    samples: List[float] = []
+    rows: List[dict[str, Any]] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = await engine.fetch(LIMIT)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "rows": len(rows),
+        "ms_median": round(statistics.median(samples), 2),
+        "ms_min": round(min(samples), 2),
+        "result": rows,
+    }
+
+
+async def main(runs: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    browser = BrowserManager(1, frozenset({"image", "media", "font", "stylesheet"}))
+    chromium_error = None
+    try:
+        await browser.start()
+        async with browser.page():
+            pass
+    except Exception as exc:
+        chromium_error = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+
+    report: dict[str, Any] = {}
+    for path, fixture in PAGES.items():
+        http = HttpFetchEngine(url=base + path, base_url=HLTV_URL)
+        case: dict[str, Any] = {"http": await timed(http, runs)}
+        await http.close()
+        if chromium_error is None:
+            chromium = PlaywrightFetchEngine(url=base + path, base_url=HLTV_URL, browser=browser)
+            case["playwright"] = await timed(chromium, runs)
+            case["identical"] = case["http"]["result"] == case["playwright"]["result"]
+        for result in case.values():
+            if isinstance(result, dict):
+                result.pop("result")
+        report[fixture] = case
+
+    chain = EngineChain(
+        [
+            HttpFetchEngine(url=base + BLOCKED_PAGE, base_url=HLTV_URL),
+            PlaywrightFetchEngine(url=base + "/", base_url=HLTV_URL, browser=browser),
+        ]
+    )
+    try:
+        rows = await chain.fetch(LIMIT)
+        fallback: dict[str, Any] = {"engine": chain.last_engine, "rows": len(rows)}
+    except Exception as exc:
+        fallback = {"engine": None, "error": str(exc).splitlines()[0]}
+    await chain.close()
+    await browser.stop()
+    server.shutdown()
+
+    print(
+        json.dumps(
+            {
+                "runs": runs,
+                "chromium": chromium_error or "ok",
+                "fixtures": report,
+                "blocked_fallback": {**fallback, "fallbacks": chain.fallbacks},
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args().runs))
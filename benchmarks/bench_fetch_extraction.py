@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Per-fetch latency of the newsline scraper against a local HTML fixture.
+
+Compares the old per-element extraction (~8 awaited Playwright calls per
+anchor) with the single ``page.evaluate`` pass, with and without resource
+blocking. Static assets are served with an artificial delay so the effect of
+aborting images/fonts/stylesheets is visible without hitting hltv.org.
+
+    python benchmarks/bench_fetch_extraction.py --runs 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from app.tasks.browser import LAUNCH_ARGS, USER_AGENT  # noqa: E402
+from app.tasks.engines import NEWSLINE_SELECTOR, extract_news  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ASSET_DELAY_SECONDS = 0.05
+LIMIT = 10
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, directory=FIXTURES, **kwargs)
+
+    def do_GET(self) -> None:
+        if self.path in ("/", "/index.html"):
+            self.path = "/hltv_frontpage.html"
+            return super().do_GET()
+        # Stand-in for images, fonts and stylesheets on a remote CDN.
+        time.sleep(ASSET_DELAY_SECONDS)
+        body = b"/* asset */"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+async def legacy_extract(page: Any, limit: int, base_url: str) -> List[dict[str, Any]]:
+    items = []
+    for anchor in (await page.query_selector_all(NEWSLINE_SELECTOR))[:limit]:
+        url = await anchor.get_attribute("href") or ""
+        title_el = await anchor.query_selector(".newstext")
+        title = (await title_el.inner_text()) if title_el else "No title"
+        country_el = await anchor.query_selector(".newsflag")
+        country = await country_el.get_attribute("title") if country_el else None
+        published_el = await anchor.query_selector(".newsrecent")
+        published_text = await published_el.inner_text() if published_el else None
+        comments_el = await anchor.query_selector(".newstc div:last-child")
+        comments_raw = await comments_el.inner_text() if comments_el else None
+        comments: Optional[int] = None
+        if comments_raw:
+            digits = "".join(ch for ch in comments_raw if ch.isdigit())
+            comments = int(digits) if digits else None
+        items.append(
+            {
+                "title": title.strip(),
+                "url": f"{base_url}{url}".strip(),
+                "country": country,
+                "published_text": published_text,
+                "comments": comments,
+            }
+        )
+    return items
+
+
+async def _block(route: Any) -> None:
+    if route.request.resource_type in {"image", "media", "font", "stylesheet"}:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def run_case(browser: Any, url: str, extractor: Any, block: bool, runs: int) -> dict[str, Any]:
+    context = await browser.new_context(user_agent=USER_AGENT)
+    if block:
+        await context.route("**/*", _block)
+    page = await context.new_page()
+    fetch_ms: List[float] = []
+    extract_ms: List[float] = []
+    rows: List[dict[str, Any]] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await page.goto(url, wait_until="load")
+        await page.wait_for_selector(NEWSLINE_SELECTOR)
+        extract_started = time.perf_counter()
+        rows = await extractor(page, LIMIT, "https://www.hltv.org")
+        done = time.perf_counter()
+        extract_ms.append((done - extract_started) * 1000)
+        fetch_ms.append((done - started) * 1000)
+    await context.close()
+    return {
+        "rows": len(rows),
+        "fetch_ms_median": round(statistics.median(fetch_ms), 2),
+        "extract_ms_median": round(statistics.median(extract_ms), 2),
+        "result": rows,
+    }
+
+
+async def main(runs: int) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        cases = {
+            "legacy_per_element": await run_case(browser, url, legacy_extract, False, runs),
+            "evaluate": await run_case(browser, url, extract_news, False, runs),
+            "evaluate_blocked": await run_case(browser, url, extract_news, True, runs),
+        }
+        await browser.close()
+    server.shutdown()
+
+    baseline = cases["legacy_per_element"]["result"]
+    report = {}
+    for name, case in cases.items():
+        same = case.pop("result") == baseline
+        report[name] = {**case, "matches_legacy": same}
+    print(json.dumps({"runs": runs, "limit": LIMIT, "cases": report}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    asyncio.run(main(parser.parse_args().runs))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Title search latency: FTS5 ``/items/search`` query against a ``LIKE`` scan.
+
+Builds a throwaway database with ``--rows`` synthetic titles (common words
+plus one long-tail name each) through the app's own schema and triggers,
+then times the same queries with ``search_news`` (windowed and full
+ranking) and with ``title LIKE '%word%'``.
+
+    python benchmarks/bench_search.py --rows 1000000 --runs 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.session import POST_CREATE_DDL, Base, configure_sqlite  # noqa: E402
+from app.models.news import NewsItem  # noqa: E402
+from app.services.search import search_news  # noqa: E402
+
+WORDS = (
+    "navi vitality faze spirit mouz g2 liquid heroic astralis ence cloud9 complexity "
+    "major blast iem esl pgl qualifier final semifinal playoffs group stage roster "
+    "signs benches transfer coach interview preview recap highlights stats ranking "
+    "mirage inferno nuke ancient anubis overpass vertigo dust2 train cache clutch ace "
+    "award mvp rookie veteran retires returns announces confirms wins loses upset"
+).split()
+LIMIT = 20
+
+
+def _rare_words(count: int) -> List[str]:
+    # Long tail of player/team-like names that each appear in a few titles.
+    rng = random.Random(7)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=rng.randint(5, 8))) for _ in range(count)]
+
+
+RARE = _rare_words(100000)
+QUERIES = {
+    "common_word": "clutch",
+    "two_common_words": "navi major",
+    "prefix": "semifin",
+    "rare_word": RARE[12345],
+    "no_match": "zzzzqx",
+}
+
+
+def build(path: str, rows: int) -> None:
+    async def create_schema() -> None:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            for statement in POST_CREATE_DDL:
+                await conn.exec_driver_sql(statement)
+        await engine.dispose()
+
+    asyncio.run(create_schema())
+    rng = random.Random(42)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=OFF")
+    batch = 50000
+    for start in range(0, rows, batch):
+        db.executemany(
+            "INSERT INTO news_items (title, url) VALUES (?, ?)",
+            (
+                (
+                    " ".join(rng.choices(WORDS, k=rng.randint(4, 10)) + [rng.choice(RARE)]),
+                    f"https://example.test/{i}",
+                )
+                for i in range(start, min(rows, start + batch))
+            ),
+        )
+        db.commit()
+    db.close()
+
+
+async def timed(runs: int, query: Callable[[], Awaitable[int]]) -> dict[str, Any]:
+    samples: List[float] = []
+    hits = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        hits = await query()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "hits": hits,
+        "ms_median": round(statistics.median(samples), 3),
+        "ms_p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+async def measure(path: str, runs: int) -> dict[str, Any]:
+    engine = configure_sqlite(create_async_engine(f"sqlite+aiosqlite:///{path}"), read_only=True)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    report = {}
+    async with factory() as session:
+        for name, q in QUERIES.items():
+
+            async def fts(session: AsyncSession = session, q: str = q) -> int:
+                return len(await search_news(session, q, LIMIT))
+
+            async def fts_rank_all(session: AsyncSession = session, q: str = q) -> int:
+                return len(await search_news(session, q, LIMIT, rank_window=0))
+
+            async def like(session: AsyncSession = session, q: str = q) -> int:
+                stmt = select(NewsItem).order_by(NewsItem.id.desc()).limit(LIMIT)
+                for word in q.split():
+                    stmt = stmt.where(NewsItem.title.like(f"%{word}%"))
+                return len((await session.scalars(stmt)).all())
+
+            report[name] = {
+                "query": q,
+                "fts5": await timed(runs, fts),
+                "fts5_rank_all": await timed(runs, fts_rank_all),
+                "like": await timed(runs, like),
+            }
+    await engine.dispose()
+    return report
+
+
+def main(rows: int, runs: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        started = time.perf_counter()
+        build(path, rows)
+        build_seconds = time.perf_counter() - started
+        queries = asyncio.run(measure(path, runs))
+    print(
+        json.dumps(
+            {
+                "rows": rows,
+                "runs": runs,
+                "limit": LIMIT,
+                "build_seconds": round(build_seconds, 1),
+                "queries": queries,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    main(args.rows, args.runs)
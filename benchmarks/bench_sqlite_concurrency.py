@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Read latency and throughput of /items-style queries while writes run.
+
+Compares the default setup (one engine, rollback journal, every writer opens
+its own transaction and commits) with the tuned one: WAL and connection
+pragmas, a separate read-only pool and all writes funnelled through the
+group-committing ``DatabaseWriter``.
+
+    python benchmarks/bench_sqlite_concurrency.py --seconds 5 --readers 8 --writers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.session import Base, configure_sqlite  # noqa: E402
+from app.db.writer import DatabaseWriter  # noqa: E402
+from app.models.news import NewsItem  # noqa: E402
+
+PAGE_SIZE = 50
+
+
+async def seed(url: str, rows: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            NewsItem.__table__.insert(),
+            [{"title": f"title {i}", "url": f"https://example.test/{i}"} for i in range(rows)],
+        )
+    await engine.dispose()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run_case(
+    read_factory: async_sessionmaker[AsyncSession],
+    write: Callable[[Callable[[AsyncSession], Awaitable[Any]]], Awaitable[Any]],
+    rows: int,
+    seconds: float,
+    readers: int,
+    writers: int,
+) -> dict[str, Any]:
+    deadline = time.perf_counter() + seconds
+    read_ms: List[float] = []
+    writes = 0
+    write_errors = 0
+
+    async def reader() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            async with read_factory() as session:
+                await session.scalars(
+                    select(NewsItem).order_by(NewsItem.id.desc()).limit(PAGE_SIZE)
+                )
+            read_ms.append((time.perf_counter() - started) * 1000)
+
+    async def writer() -> None:
+        nonlocal writes, write_errors
+        while time.perf_counter() < deadline:
+            item_id = random.randint(1, rows)
+
+            async def job(session: AsyncSession) -> None:
+                await session.execute(
+                    update(NewsItem)
+                    .where(NewsItem.id == item_id)
+                    .values(comments=random.randint(0, 999))
+                )
+
+            try:
+                await write(job)
+                writes += 1
+            except Exception:
+                write_errors += 1
+
+    await asyncio.gather(*[reader() for _ in range(readers)], *[writer() for _ in range(writers)])
+    return {
+        "reads": len(read_ms),
+        "reads_per_second": round(len(read_ms) / seconds, 1),
+        "read_ms_p50": round(statistics.median(read_ms), 3) if read_ms else None,
+        "read_ms_p99": round(_percentile(read_ms, 0.99), 3),
+        "writes": writes,
+        "writes_per_second": round(writes / seconds, 1),
+        "write_errors": write_errors,
+    }
+
+
+async def baseline(url: str, **kwargs: Any) -> dict[str, Any]:
+    engine = create_async_engine(url)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def write(job: Callable[[AsyncSession], Awaitable[Any]]) -> None:
+        async with factory() as session:
+            await job(session)
+            await session.commit()
+
+    try:
+        return await run_case(factory, write, **kwargs)
+    finally:
+        await engine.dispose()
+
+
+async def tuned(url: str, readers: int, **kwargs: Any) -> dict[str, Any]:
+    write_engine = configure_sqlite(create_async_engine(url))
+    read_engine = configure_sqlite(create_async_engine(url, pool_size=readers), read_only=True)
+    writer = DatabaseWriter(async_sessionmaker(write_engine, expire_on_commit=False), 64)
+    await writer.start()
+    try:
+        result = await run_case(
+            async_sessionmaker(read_engine, expire_on_commit=False),
+            writer.run,
+            readers=readers,
+            **kwargs,
+        )
+        return {**result, "writer": writer.stats()}
+    finally:
+        await writer.stop()
+        await write_engine.dispose()
+        await read_engine.dispose()
+
+
+async def main(args: argparse.Namespace) -> None:
+    options = {
+        "rows": args.rows,
+        "seconds": args.seconds,
+        "readers": args.readers,
+        "writers": args.writers,
+    }
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, case in (("baseline", baseline), ("wal_single_writer", tuned)):
+            path = os.path.join(tmp, f"{name}.db")
+            await seed(f"sqlite+aiosqlite:///{path}", args.rows)
+            report[name] = await case(f"sqlite+aiosqlite:///{path}", **options)
+    print(json.dumps({**options, "cases": report}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark suite: REST reads, scrape sync, WebSocket fan-out and NATS.
+
+Everything runs locally. For each ``--sizes`` entry a SQLite database is
+seeded through the app's schema and triggers, and the app is started with
+uvicorn in a subprocess. Its fetcher is pointed (``FETCH_URL``,
+``FETCH_ENGINES=http``) at a local server replaying
+``fixtures/hltv_frontpage.html`` with the comment counts bumped on every
+request, so each scrape updates every row. NATS is a local ``nats-server``
+when one is on ``PATH`` (or ``--nats-url``), else the in-process
+:mod:`nats_standin`.
+
+Measured per size:
+
+* ``items``: ``GET /items`` throughput and latency percentiles over a mix
+  of first pages, orderings, country filters and cursor pages, with the
+  read cache on and off;
+* ``sync``: wall time of ``POST /tasks/run`` plus the fetch and upsert
+  histograms from ``/metrics``;
+* ``ws_fanout``: ``PATCH /items/{id}`` until the last of N WebSocket
+  clients has the ``item.updated`` event;
+* ``nats``: ``PATCH`` until a NATS subscriber has the event, and a foreign
+  NATS publish until a WebSocket client has it as ``nats.forwarded``.
+
+Results are printed (or written to ``--out``) as JSON with the git commit
+and host details, so runs can be compared over time.
+
+    python benchmarks/bench_suite.py --sizes 10000,100000,1000000 --out bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import httpx  # noqa: E402
+import nats  # noqa: E402
+import websockets  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from app.db.session import POST_CREATE_DDL, Base  # noqa: E402
+from app.models import news  # noqa: E402,F401  (registers the tables on Base)
+from nats_standin import NatsStandIn  # noqa: E402
+
+FRONTPAGE = os.path.join(BENCH_DIR, "fixtures", "hltv_frontpage.html")
+COUNTRIES = ("Denmark", "Sweden", "France", "Russia", "Brazil", "United States", "Poland")
+COMMENTS_RE = re.compile(rb"(\d+) comments")
+HISTOGRAMS = ("hltv_sync_upsert_duration_seconds", "hltv_fetch_duration_seconds")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentiles(samples: List[float]) -> Dict[str, Any]:
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+    return {
+        "n": len(ordered),
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+# -- database -----------------------------------------------------------------
+
+
+async def seed(path: str, rows: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in POST_CREATE_DDL:
+            await conn.exec_driver_sql(statement)
+    await engine.dispose()
+    await asyncio.to_thread(_insert_rows, path, rows)
+
+
+def _insert_rows(path: str, rows: int) -> None:
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=OFF")
+    batch = 50000
+    for first in range(0, rows, batch):
+        values = []
+        for i in range(first, min(rows, first + batch)):
+            stamp = (start + timedelta(seconds=i * 30)).strftime("%Y-%m-%d %H:%M:%S.%f")
+            values.append(
+                (
+                    f"Seeded headline {i}",
+                    f"https://seed.test/news/{i}",
+                    rng.choice(COUNTRIES),
+                    rng.randint(0, 2000),
+                    "1 day ago",
+                    stamp,
+                    stamp,
+                )
+            )
+        db.executemany(
+            "INSERT INTO news_items "
+            "(title, url, country, comments, published_text, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            values,
+        )
+        db.commit()
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.close()
+
+
+# -- fixture front page ---------------------------------------------------------
+
+
+class FrontPageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 1 << 16
+    page = b""
+    served = 0
+
+    def do_GET(self) -> None:
+        cls = type(self)
+        cls.served += 1
+        bump = cls.served
+        body = COMMENTS_RE.sub(lambda m: b"%d comments" % (int(m.group(1)) + bump), cls.page)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+    with open(FRONTPAGE, "rb") as fh:
+        FrontPageHandler.page = fh.read()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FrontPageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# -- app process ----------------------------------------------------------------
+
+
+class AppProcess:
+    def __init__(self, db_path: str, env: Dict[str, str], log_dir: str) -> None:
+        self.port = _free_port()
+        self.base = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            **os.environ,
+            **env,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+            "HLTV_LOG_DIR": log_dir,
+            "FETCH_ENGINES": "http",
+            "FETCH_INTERVAL_SECONDS": "86400",
+        }
+        self.proc: Optional[subprocess.Popen] = None
+
+    async def __aenter__(self) -> "AppProcess":
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.main:app",
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--log-level", "warning", "--no-access-log",
+            ],
+            cwd=ROOT,
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        async with httpx.AsyncClient(base_url=self.base, timeout=5) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                if self.proc.poll() is not None:
+                    raise RuntimeError(f"app exited with code {self.proc.returncode}")
+                try:
+                    status = (await client.get("/tasks/status")).json()
+                    # Wait out the startup scrape so it does not skew the reads.
+                    if not status["running"] and status["recent_runs"]:
+                        return self
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("app did not become ready within 60s")
+                await asyncio.sleep(0.2)
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(15)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+# -- scenarios ------------------------------------------------------------------
+
+
+def _items_requests(rows: int) -> List[str]:
+    paths = [
+        "/items",
+        "/items?limit=20",
+        "/items?order=comments",
+        "/items?order=updated_at&limit=100",
+        "/items?min_comments=1500",
+    ]
+    paths += [f"/items?country={country}" for country in COUNTRIES]
+    paths += [f"/items?offset={offset}" for offset in (100, 1000) if offset < rows]
+    return paths
+
+
+async def bench_items(base: str, rows: int, concurrency: int, seconds: float) -> Dict[str, Any]:
+    paths = _items_requests(rows)
+    latencies: List[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=30) as client:
+        # Follow a few cursor chains so keyset pages are part of the mix.
+        for order in ("id", "comments"):
+            cursor = None
+            for _ in range(5):
+                params = {"order": order, **({"cursor": cursor} if cursor else {})}
+                response = await client.get("/items", params=params)
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+                paths.append(str(httpx.URL("/items", params={"order": order, "cursor": cursor})))
+
+        deadline = time.perf_counter() + seconds
+
+        async def worker(offset: int) -> None:
+            nonlocal errors
+            index = offset
+            while time.perf_counter() < deadline:
+                path = paths[index % len(paths)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    response.read()
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+        "distinct_requests": len(paths),
+        **_percentiles(latencies),
+    }
+
+
+def _histogram_totals(text: str) -> Dict[str, Dict[str, float]]:
+    totals: Dict[str, Dict[str, float]] = {name: {"sum": 0.0, "count": 0.0} for name in HISTOGRAMS}
+    for line in text.splitlines():
+        for name in HISTOGRAMS:
+            for part in ("sum", "count"):
+                if line.startswith(f"{name}_{part}"):
+                    totals[name][part] += float(line.rsplit(" ", 1)[1])
+    return totals
+
+
+async def bench_sync(base: str, scrapes: int) -> Dict[str, Any]:
+    walls: List[float] = []
+    counts: Dict[str, int] = {"created": 0, "updated": 0, "unchanged": 0}
+    async with httpx.AsyncClient(base_url=base, timeout=120) as client:
+        before = _histogram_totals((await client.get("/metrics")).text)
+        for _ in range(scrapes):
+            started = time.perf_counter()
+            response = await client.post("/tasks/run")
+            walls.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+            result = response.json()
+            for key in counts:
+                counts[key] += result.get(key, 0)
+        after = _histogram_totals((await client.get("/metrics")).text)
+    report: Dict[str, Any] = {"scrapes": scrapes, **counts, "wall": _percentiles(walls)}
+    for name in HISTOGRAMS:
+        runs = after[name]["count"] - before[name]["count"]
+        seconds = after[name]["sum"] - before[name]["sum"]
+        key = name.replace("hltv_", "").replace("_duration_seconds", "")
+        report[f"{key}_mean_ms"] = round(seconds / runs * 1000, 3) if runs else None
+    return report
+
+
+class WsClient:
+    """Reads ``/ws/items`` and resolves a future when a marker shows up."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.waiting: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._ws: Any = None
+
+    async def start(self) -> None:
+        self._ws = await websockets.connect(self.url, max_queue=None)
+        self._task = asyncio.create_task(self._read())
+
+    async def _read(self) -> None:
+        try:
+            async for raw in self._ws:
+                text = raw if isinstance(raw, str) else raw.decode()
+                for marker, future in list(self.waiting.items()):
+                    if marker in text and not future.done():
+                        future.set_result(time.perf_counter())
+        except websockets.ConnectionClosed:
+            pass
+
+    def expect(self, marker: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[marker] = future
+        return future
+
+    async def stop(self) -> None:
+        await self._ws.close()
+        if self._task is not None:
+            await self._task
+
+
+async def _open_clients(base: str, count: int) -> List[WsClient]:
+    url = base.replace("http://", "ws://") + "/ws/items"
+    clients = [WsClient(url) for _ in range(count)]
+    await asyncio.gather(*(client.start() for client in clients))
+    return clients
+
+
+async def bench_ws_fanout(base: str, clients: int, events: int) -> Dict[str, Any]:
+    sockets = await _open_clients(base, clients)
+    first: List[float] = []
+    last: List[float] = []
+    missed = 0
+    try:
+        async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+            for n in range(events):
+                marker = f"fanout-{uuid.uuid4().hex}"
+                futures = [ws.expect(marker) for ws in sockets]
+                started = time.perf_counter()
+                response = await client.patch("/items/1", json={"title": marker})
+                response.raise_for_status()
+                done, pending = await asyncio.wait(futures, timeout=10)
+                missed += len(pending)
+                arrivals = [future.result() for future in done]
+                if arrivals:
+                    first.append((min(arrivals) - started) * 1000)
+                    last.append((max(arrivals) - started) * 1000)
+                for ws in sockets:
+                    ws.waiting.pop(marker, None)
+    finally:
+        await asyncio.gather(*(ws.stop() for ws in sockets))
+    return {
+        "clients": clients,
+        "events": events,
+        "missed": missed,
+        "first_client": _percentiles(first),
+        "last_client": _percentiles(last),
+    }
+
+
+async def bench_nats(base: str, nats_url: str, events: int) -> Dict[str, Any]:
+    nc = await nats.connect(nats_url)
+    (ws,) = await _open_clients(base, 1)
+    waiting: Dict[str, asyncio.Future] = {}
+
+    async def on_message(msg: Any) -> None:
+        text = msg.data.decode()
+        for marker, future in list(waiting.items()):
+            if marker in text and not future.done():
+                future.set_result(time.perf_counter())
+
+    await nc.subscribe("items.updates", cb=on_message)
+    await nc.flush()
+    to_nats: List[float] = []
+    to_ws: List[float] = []
+    missed = 0
+    try:
+        async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+            for _ in range(events):
+                marker = f"nats-{uuid.uuid4().hex}"
+                future = waiting[marker] = asyncio.get_running_loop().create_future()
+                started = time.perf_counter()
+                (await client.patch("/items/2", json={"title": marker})).raise_for_status()
+                try:
+                    to_nats.append((await asyncio.wait_for(future, 10) - started) * 1000)
+                except asyncio.TimeoutError:
+                    missed += 1
+                waiting.pop(marker, None)
+
+            for _ in range(events):
+                marker = f"ping-{uuid.uuid4().hex}"
+                future = ws.expect(marker)
+                event = {
+                    "event": "bench.ping",
+                    "data": {"marker": marker},
+                    "origin": "bench-suite",
+                    "event_id": uuid.uuid4().hex,
+                }
+                started = time.perf_counter()
+                await nc.publish("items.updates", json.dumps(event).encode())
+                try:
+                    to_ws.append((await asyncio.wait_for(future, 10) - started) * 1000)
+                except asyncio.TimeoutError:
+                    missed += 1
+                ws.waiting.pop(marker, None)
+    finally:
+        await ws.stop()
+        await nc.close()
+    return {
+        "events": events,
+        "missed": missed,
+        "rest_to_nats": _percentiles(to_nats),
+        "nats_to_ws": _percentiles(to_ws),
+    }
+
+
+# -- driver ---------------------------------------------------------------------
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_size(
+    args: argparse.Namespace, rows: int, workdir: str, fixture: str, nats_url: str
+) -> Dict[str, Any]:
+    db_path = os.path.join(workdir, f"news_{rows}.db")
+    started = time.perf_counter()
+    await seed(db_path, rows)
+    report: Dict[str, Any] = {"rows": rows, "seed_seconds": round(time.perf_counter() - started, 2)}
+    env = {"FETCH_URL": fixture, "NATS_URL": nats_url}
+
+    async with AppProcess(db_path, {**env, "READ_CACHE_MAX_BYTES": "0"}, workdir) as app:
+        report["items_uncached"] = await bench_items(app.base, rows, args.concurrency, args.seconds)
+
+    async with AppProcess(db_path, env, workdir) as app:
+        report["items_cached"] = await bench_items(app.base, rows, args.concurrency, args.seconds)
+        report["sync"] = await bench_sync(app.base, args.scrapes)
+        report["ws_fanout"] = [
+            await bench_ws_fanout(app.base, clients, args.events) for clients in args.ws_clients
+        ]
+        report["nats"] = await bench_nats(app.base, nats_url, args.events)
+    return report
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    fixture_server = start_fixture_server()
+    fixture = f"http://127.0.0.1:{fixture_server.server_address[1]}/"
+    nats_proc: Optional[subprocess.Popen] = None
+    standin: Optional[NatsStandIn] = None
+    nats_url = args.nats_url
+    if nats_url:
+        nats_kind = "external"
+    elif shutil.which("nats-server"):
+        port = _free_port()
+        nats_proc = subprocess.Popen(
+            ["nats-server", "-a", "127.0.0.1", "-p", str(port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        nats_url, nats_kind = f"nats://127.0.0.1:{port}", "nats-server"
+        await asyncio.sleep(0.5)
+    else:
+        standin = NatsStandIn()
+        await standin.start()
+        nats_url, nats_kind = standin.url, "standin"
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="hltv-bench-") as workdir:
+            for rows in args.sizes:
+                print(f"benchmarking {rows} rows...", file=sys.stderr)
+                results.append(await run_size(args, rows, workdir, fixture, nats_url))
+    finally:
+        fixture_server.shutdown()
+        if standin is not None:
+            await standin.stop()
+        if nats_proc is not None:
+            nats_proc.terminate()
+            nats_proc.wait()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "nats": nats_kind,
+            "args": {
+                key: value for key, value in vars(args).items() if key not in ("out", "nats_url")
+            },
+        },
+        "results": results,
+    }
+
+
+def _ints(raw: str) -> List[int]:
+    return [int(part) for part in raw.split(",") if part.strip()]
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=_ints, default=[10000, 100000, 1000000])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--scrapes", type=int, default=5)
+    parser.add_argument("--ws-clients", type=_ints, default=[10, 100])
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--nats-url", help="use this NATS server instead of starting one")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_args()
+    report = asyncio.run(main(options))
+    text = json.dumps(report, indent=2)
+    if options.out:
+        with open(options.out, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
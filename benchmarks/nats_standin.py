@@ -0,0 +1,111 @@
+"""In-process stand-in for a core NATS server, for benchmarks without ``nats-server``.
+
+Speaks the subset of the client protocol the app and nats-py use for plain
+pub/sub and request/reply: CONNECT, PING/PONG, SUB/UNSUB, PUB and HPUB,
+with ``*`` and ``>`` wildcards. No JetStream, clustering or auth.
+"""
+import asyncio
+import json
+from typing import Dict, List, Optional
+
+INFO = {
+    "server_id": "bench-standin",
+    "server_name": "bench-standin",
+    "version": "2.10.0",
+    "proto": 1,
+    "headers": True,
+    "max_payload": 1048576,
+}
+
+
+def subject_matches(pattern: str, subject: str) -> bool:
+    want, got = pattern.split("."), subject.split(".")
+    for index, token in enumerate(want):
+        if token == ">":
+            return len(got) > index
+        if index >= len(got) or (token != "*" and token != got[index]):
+            return False
+    return len(want) == len(got)
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.subs: Dict[str, str] = {}  # sid -> subject pattern
+
+
+class NatsStandIn:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: List[_Client] = []
+
+    @property
+    def url(self) -> str:
+        return f"nats://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        for client in list(self._clients):
+            client.writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _deliver(
+        self, subject: str, reply: Optional[str], headers: bytes, payload: bytes
+    ) -> None:
+        for client in self._clients:
+            for sid, pattern in client.subs.items():
+                if not subject_matches(pattern, subject):
+                    continue
+                reply_part = f" {reply}" if reply else ""
+                if headers:
+                    total = len(headers) + len(payload)
+                    head = f"HMSG {subject} {sid}{reply_part} {len(headers)} {total}\r\n"
+                    client.writer.write(head.encode() + headers + payload + b"\r\n")
+                else:
+                    head = f"MSG {subject} {sid}{reply_part} {len(payload)}\r\n"
+                    client.writer.write(head.encode() + payload + b"\r\n")
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = _Client(writer)
+        self._clients.append(client)
+        writer.write(f"INFO {json.dumps(INFO)}\r\n".encode())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode().split()
+                if not parts:
+                    continue
+                op, args = parts[0].upper(), parts[1:]
+                if op == "PING":
+                    writer.write(b"PONG\r\n")
+                elif op == "SUB":
+                    # SUB <subject> [queue group] <sid>
+                    client.subs[args[-1]] = args[0]
+                elif op == "UNSUB":
+                    client.subs.pop(args[0], None)
+                elif op == "PUB":
+                    subject, size = args[0], int(args[-1])
+                    reply = args[1] if len(args) == 3 else None
+                    data = await reader.readexactly(size + 2)
+                    self._deliver(subject, reply, b"", data[:-2])
+                elif op == "HPUB":
+                    subject, header_size, total = args[0], int(args[-2]), int(args[-1])
+                    reply = args[1] if len(args) == 4 else None
+                    data = await reader.readexactly(total + 2)
+                    self._deliver(subject, reply, data[:header_size], data[header_size:-2])
+                # CONNECT and PONG need no answer.
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.remove(client)
+            writer.close()
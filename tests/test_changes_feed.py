@@ -0,0 +1,36 @@
+import asyncio
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.session import POST_CREATE_DDL, Base
+from app.models.news import NewsItem
+from app.services.news_service import get_changes_since
+
+
+async def _changes_after_delete_and_create(path: str) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in POST_CREATE_DDL:
+            await conn.exec_driver_sql(statement)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessions() as session:
+        for n in (1, 2):
+            session.add(NewsItem(title=f"Item {n}", url=f"https://example.com/{n}"))
+        await session.commit()
+        since = (await get_changes_since(session, 0, 100))["version"]
+        await session.execute(delete(NewsItem).where(NewsItem.id == 2))
+        await session.commit()
+        # SQLite hands the freed rowid 2 to the next insert.
+        session.add(NewsItem(title="Item 3", url="https://example.com/3"))
+        await session.commit()
+        changes = await get_changes_since(session, since, 100)
+    await engine.dispose()
+    return changes
+
+
+def test_delete_then_create_with_reused_id(tmp_path):
+    changes = asyncio.run(_changes_after_delete_and_create(str(tmp_path / "news.db")))
+    assert [(item.id, item.url) for item in changes["changed"]] == [(2, "https://example.com/3")]
+    assert changes["deleted"] == []
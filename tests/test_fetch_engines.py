@@ -0,0 +1,148 @@
+"""Parse parity of the fetch engines on the recorded front-page fixtures.
+
+The fixtures are served by a local stand-in server. The Playwright tests are
+skipped when playwright is not installed or Chromium cannot be launched,
+unless ``REQUIRE_CHROMIUM=1`` is set, in which case that is a failure.
+"""
+import asyncio
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.tasks.browser import BrowserManager
+from app.tasks.engines import (
+    HLTV_URL,
+    EngineChain,
+    HttpFetchEngine,
+    PlaywrightFetchEngine,
+    parse_news_html,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks", "fixtures")
+PAGES = {"/": "hltv_frontpage.html", "/edge": "hltv_frontpage_edge.html"}
+BLOCKED_PAGE = "/blocked"
+LIMIT = 100
+
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as fh:
+        return fh.read()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path in PAGES:
+            status, body = 200, _read(PAGES[self.path])
+        elif self.path == BLOCKED_PAGE:
+            status, body = 403, _read("hltv_blocked.html")
+        else:
+            status, body = 404, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _require_playwright() -> None:
+    if os.getenv("REQUIRE_CHROMIUM"):
+        import playwright  # noqa: F401
+    else:
+        pytest.importorskip("playwright")
+
+
+async def _fetch(engine) -> list:
+    try:
+        return await engine.fetch(LIMIT)
+    finally:
+        await engine.close()
+
+
+async def _launch_or_skip(browser: BrowserManager) -> None:
+    try:
+        async with browser.page():
+            pass
+    except Exception as exc:
+        await browser.stop()
+        reason = f"Chromium unavailable: {(str(exc) or repr(exc)).splitlines()[0]}"
+        if os.getenv("REQUIRE_CHROMIUM"):
+            pytest.fail(reason)
+        pytest.skip(reason)
+
+
+@pytest.mark.parametrize("path", sorted(PAGES))
+def test_http_engine_parses_fixture(base_url, path):
+    rows = asyncio.run(_fetch(HttpFetchEngine(url=base_url + path, base_url=HLTV_URL)))
+    assert rows
+    assert rows == parse_news_html(_read(PAGES[path]).decode(), LIMIT, HLTV_URL)
+
+
+def test_blocked_page_falls_back_to_next_engine(base_url):
+    chain = EngineChain(
+        [
+            HttpFetchEngine(url=base_url + BLOCKED_PAGE, base_url=HLTV_URL),
+            HttpFetchEngine(url=base_url + "/", base_url=HLTV_URL),
+        ]
+    )
+    rows = asyncio.run(_fetch(chain))
+    assert chain.fallbacks == 1
+    assert rows == parse_news_html(_read(PAGES["/"]).decode(), LIMIT, HLTV_URL)
+
+
+@pytest.mark.parametrize("path", sorted(PAGES))
+def test_playwright_matches_http_engine(base_url, path):
+    _require_playwright()
+
+    async def run() -> tuple:
+        browser = BrowserManager(1)
+        await _launch_or_skip(browser)
+        try:
+            http = await _fetch(HttpFetchEngine(url=base_url + path, base_url=HLTV_URL))
+            chromium = await _fetch(
+                PlaywrightFetchEngine(url=base_url + path, base_url=HLTV_URL, browser=browser)
+            )
+        finally:
+            await browser.stop()
+        return http, chromium
+
+    http, chromium = asyncio.run(run())
+    assert http
+    assert chromium == http
+
+
+def test_blocked_page_falls_back_to_chromium(base_url):
+    _require_playwright()
+
+    async def run() -> tuple:
+        browser = BrowserManager(1)
+        await _launch_or_skip(browser)
+        chain = EngineChain(
+            [
+                HttpFetchEngine(url=base_url + BLOCKED_PAGE, base_url=HLTV_URL),
+                PlaywrightFetchEngine(url=base_url + "/", base_url=HLTV_URL, browser=browser),
+            ]
+        )
+        try:
+            return await _fetch(chain), chain
+        finally:
+            await browser.stop()
+
+    rows, chain = asyncio.run(run())
+    assert chain.last_engine == "playwright"
+    assert chain.fallbacks == 1
+    assert rows == parse_news_html(_read(PAGES["/"]).decode(), LIMIT, HLTV_URL)
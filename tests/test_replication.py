@@ -0,0 +1,91 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.session import POST_CREATE_DDL, Base
+from app.models.news import NewsItem
+from app.services.replication import ReplicationApplier
+
+
+class _Writer:
+    def __init__(self, sessions: async_sessionmaker) -> None:
+        self.sessions = sessions
+
+    async def run(self, fn):
+        async with self.sessions() as session, session.begin():
+            return await fn(session)
+
+
+async def _apply(path: str, existing: list, events: list) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in POST_CREATE_DDL:
+            await conn.exec_driver_sql(statement)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessions() as session:
+        session.add_all(NewsItem(title=f"old {url}", url=url) for url in existing)
+        await session.commit()
+    applier = ReplicationApplier(_Writer(sessions), 100, 60)
+    for event, data in events:
+        await applier.submit(event, data)
+    assert await applier.commit()
+    async with sessions() as session:
+        rows = await session.execute(select(NewsItem.url, NewsItem.title, NewsItem.comments))
+    await engine.dispose()
+    return {url: (title, comments) for url, title, comments in rows}
+
+
+def _run(tmp_path, existing, events):
+    return asyncio.run(_apply(str(tmp_path / "news.db"), existing, events))
+
+
+def test_create_after_delete_replaces_the_row(tmp_path):
+    rows = _run(
+        tmp_path,
+        ["x"],
+        [
+            ("item.deleted", {"id": 1, "url": "x"}),
+            ("item.created", {"id": 7, "url": "x", "title": "new x"}),
+        ],
+    )
+    assert rows == {"x": ("new x", None)}
+
+
+def test_delete_after_create_wins(tmp_path):
+    rows = _run(
+        tmp_path,
+        [],
+        [
+            ("item.created", {"id": 7, "url": "x", "title": "x"}),
+            ("item.updated", {"id": 7, "url": "x", "comments": 3}),
+            ("item.deleted", {"id": 7, "url": "x"}),
+        ],
+    )
+    assert rows == {}
+
+
+def test_updates_merge_into_pending_create(tmp_path):
+    rows = _run(
+        tmp_path,
+        [],
+        [
+            ("item.created", {"id": 7, "url": "x", "title": "x"}),
+            ("item.updated", {"id": 7, "url": "x", "comments": 3}),
+            ("item.updated", {"id": 7, "url": "y", "previous_url": "x", "title": "y"}),
+        ],
+    )
+    assert rows == {"y": ("y", 3)}
+
+
+def test_updates_are_matched_by_url(tmp_path):
+    rows = _run(
+        tmp_path,
+        ["a", "b"],
+        [
+            ("item.updated", {"id": 1, "url": "b", "comments": 5}),
+            ("item.deleted", {"id": 2, "url": "a"}),
+        ],
+    )
+    assert rows == {"b": ("old b", 5)}
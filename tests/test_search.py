@@ -0,0 +1,31 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.session import POST_CREATE_DDL, Base
+from app.models.news import NewsItem
+from app.services.search import search_news
+
+
+async def _search(path: str, title: str, q: str) -> list:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in POST_CREATE_DDL:
+            await conn.exec_driver_sql(statement)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessions() as session:
+        session.add(NewsItem(title=title, url="https://example.com/1"))
+        await session.commit()
+        hits = await search_news(session, q, 10)
+    await engine.dispose()
+    return [snippet for _, snippet, _ in hits]
+
+
+def test_snippet_escapes_title_markup(tmp_path):
+    title = "<img src=x onerror=alert(1)> NAVI win & <script>major</script>"
+    snippets = asyncio.run(_search(str(tmp_path / "news.db"), title, "navi"))
+    assert snippets == [
+        "&lt;img src=x onerror=alert(1)&gt; <mark>NAVI</mark> win &amp; "
+        "&lt;script&gt;major&lt;/script&gt;"
+    ]
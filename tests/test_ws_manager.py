@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from app.ws.manager import WebSocketManager
+
+
+class FakeWebSocket:
+    client = None
+
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def accept(self, subprotocol=None) -> None:
+        pass
+
+    async def send_text(self, data: str) -> None:
+        self.sent.append(json.loads(data))
+
+    async def close(self, code=None) -> None:
+        pass
+
+
+def _subscribe(manager, websocket, events=(), countries=(), ids=()):
+    values = {"events": set(events), "countries": set(countries), "ids": set(ids)}
+    manager.subscribe(websocket, "subscribe", values)
+
+
+async def _forward_batch() -> dict:
+    manager = WebSocketManager()
+    clients = {name: FakeWebSocket() for name in ("all", "denmark", "id5", "sweden")}
+    for websocket in clients.values():
+        await manager.connect(websocket)
+    _subscribe(manager, clients["denmark"], countries=["Denmark"])
+    _subscribe(manager, clients["id5"], ids=[5])
+    _subscribe(manager, clients["sweden"], countries=["Sweden"])
+    await asyncio.sleep(0.01)
+    for websocket in clients.values():
+        websocket.sent.clear()
+    batch = {
+        "event": "batch",
+        "data": [
+            {"event": "item.created", "data": {"id": 1, "country": "Denmark"}},
+            {"event": "item.updated", "data": {"id": 5, "comments": 2}},
+            {"event": "item.created", "data": {"id": 6, "country": "France"}},
+        ],
+    }
+    await manager.broadcast({"event": "nats.forwarded", "data": batch})
+    await asyncio.sleep(0.01)
+    return {
+        name: [[entry["data"]["id"] for entry in frame["data"]["data"]] for frame in ws.sent]
+        for name, ws in clients.items()
+    }
+
+
+def test_forwarded_batch_is_routed_per_entry():
+    assert asyncio.run(_forward_batch()) == {
+        "all": [[1, 5, 6]],
+        "denmark": [[1]],
+        "id5": [[5]],
+        "sweden": [],
+    }